@@ -5,11 +5,10 @@ import argparse
 from enum import Enum
 from pydantic import BaseModel
 from tau_bench.model_utils import default_api_from_args, API
-from tau_bench.envs.airline.tasks_test import TASKS as AIRLINE_TASKS
-from tau_bench.envs.retail.tasks_test import TASKS_TEST as RETAIL_TASKS
+from tau_bench.envs.task_store import load_tasks
 from tau_bench.model_utils.args import api_parser
 from tau_bench.types import Task, Action
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence
 from concurrent.futures import ThreadPoolExecutor
 
 def get_args() -> argparse.Namespace:
@@ -181,12 +180,9 @@ def main() -> None:
         results = json.load(f)
     print(f"Loaded {len(results)} results")
     env = args.env
-    if env == "airline":
-        tasks: List[Task] = AIRLINE_TASKS
-    elif env == "retail":
-        tasks: List[Task] = RETAIL_TASKS
-    else:
+    if env not in ["airline", "retail"]:
         raise ValueError(f"Invalid environment: {env}")
+    tasks: Sequence[Task] = load_tasks(env, "test")
     failed_results = [r for r in results if r["reward"] <= 1e-3]
     print(f"Found {len(failed_results)} failed trajectories")
     if args.max_num_failed_results is not None and len(failed_results) > args.max_num_failed_results:
@@ -0,0 +1,164 @@
+# Copyright Sierra
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List, MutableMapping, Optional
+
+from tau_bench.envs import EnvFactory, get_env
+from tau_bench.envs.base import Env
+from tau_bench.envs.response_cache import get_response_cache_stats
+from tau_bench.envs.snapshot import get_snapshot
+from tau_bench.envs.task_store import load_tasks
+from tau_bench.envs.user import BaseUserSimulationEnv
+from tau_bench.types import Action, RESPOND_ACTION_NAME
+
+
+class ScriptedUser(BaseUserSimulationEnv):
+    """A user that ends the conversation as soon as the agent responds, so that an
+    episode exercises only the environment (data, tools and reward)."""
+
+    def reset(self, instruction: Optional[str] = None) -> str:
+        return instruction or ""
+
+    def step(self, content: str) -> str:
+        return "###STOP###"
+
+    def get_total_cost(self) -> float:
+        return 0.0
+
+
+def load_domain(env_name: str) -> Dict[str, Any]:
+    if env_name == "retail":
+        from tau_bench.envs.retail import data
+        from tau_bench.envs.retail.rules import RULES
+        from tau_bench.envs.retail.tools import ALL_TOOLS
+        from tau_bench.envs.retail.wiki import WIKI
+    elif env_name == "airline":
+        from tau_bench.envs.airline import data
+        from tau_bench.envs.airline.rules import RULES
+        from tau_bench.envs.airline.tools import ALL_TOOLS
+        from tau_bench.envs.airline.wiki import WIKI
+    else:
+        raise ValueError(f"Unknown environment: {env_name}")
+    return {
+        "data": data,
+        "tools": ALL_TOOLS,
+        "tasks": load_tasks(env_name, "test"),
+        "wiki": WIKI,
+        "rules": RULES,
+    }
+
+
+def run_episode(
+    domain: Dict[str, Any],
+    data_load_func: Callable[[], MutableMapping[str, Any]],
+    task_index: int,
+    env_name: Optional[str] = None,
+) -> float:
+    env = Env(
+        data_load_func=data_load_func,
+        tools=domain["tools"],
+        tasks=domain["tasks"],
+        wiki=domain["wiki"],
+        rules=domain["rules"],
+        user_strategy="human",
+        user_model="",
+        task_index=task_index,
+        env_name=env_name,
+        task_split="test",
+    )
+    env.terminate_tools = ["transfer_to_human_agents"]
+    env.user = ScriptedUser()
+    env.reset(task_index=task_index)
+    for action in env.task.actions:
+        if action.name not in env.terminate_tools:
+            env.step(action)
+    res = env.step(Action(name=RESPOND_ACTION_NAME, kwargs={"content": "Done."}))
+    return res.reward
+
+
+def benchmark(
+    domain: Dict[str, Any],
+    data_load_func: Callable[[], MutableMapping[str, Any]],
+    num_episodes: int,
+    env_name: Optional[str] = None,
+) -> Dict[str, float]:
+    task_indices = [i % len(domain["tasks"]) for i in range(num_episodes)]
+    # warm up module imports and any process-wide caches
+    run_episode(domain, data_load_func, task_indices[0], env_name)
+    start = time.perf_counter()
+    total_reward = sum(
+        run_episode(domain, data_load_func, i, env_name) for i in task_indices
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "episodes_per_sec": num_episodes / elapsed,
+        "avg_reward": total_reward / num_episodes,
+    }
+
+
+def benchmark_load(data_load_func: Callable[[], MutableMapping[str, Any]], num_loads: int) -> float:
+    data_load_func()
+    start = time.perf_counter()
+    for _ in range(num_loads):
+        data_load_func()
+    return num_loads / (time.perf_counter() - start)
+
+
+def benchmark_setup(env_name: str, num_envs: int) -> Dict[str, float]:
+    """Per-task setup latency (ms) of building an env with `get_env` vs. `EnvFactory`."""
+    get_env(env_name, user_strategy="human", user_model="", task_split="test", task_index=0)
+    start = time.perf_counter()
+    for i in range(num_envs):
+        get_env(env_name, user_strategy="human", user_model="", task_split="test", task_index=i)
+    get_env_ms = (time.perf_counter() - start) / num_envs * 1000
+    factory = EnvFactory(env_name, user_strategy="human", user_model="", task_split="test")
+    start = time.perf_counter()
+    for i in range(num_envs):
+        factory.make(task_index=i % len(factory.tasks))
+    factory_ms = (time.perf_counter() - start) / num_envs * 1000
+    return {"get_env": get_env_ms, "factory": factory_ms}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure environment throughput (no LLM calls) by replaying the ground truth actions of each task."
+    )
+    parser.add_argument(
+        "--env", type=str, nargs="+", choices=["retail", "airline"], default=["retail", "airline"]
+    )
+    parser.add_argument("--num-episodes", type=int, default=20)
+    args = parser.parse_args()
+
+    for env_name in args.env:
+        domain = load_domain(env_name)
+        # (mode, data load function, env name for the ground truth hash cache)
+        modes: List[tuple[str, Callable[[], MutableMapping[str, Any]], Optional[str]]] = [
+            ("reparse", domain["data"].read_data, None),
+            ("clone", get_snapshot(env_name, domain["data"].read_data).clone, None),
+            ("overlay", domain["data"].load_data, None),
+            ("gt-cache", domain["data"].load_data, env_name),
+        ]
+        if hasattr(domain["data"], "load_columnar_data"):
+            modes.append(("columnar", domain["data"].load_columnar_data, env_name))
+        baseline = None
+        for mode, data_load_func, gt_cache_env_name in modes:
+            get_response_cache_stats().reset()
+            res = benchmark(domain, data_load_func, args.num_episodes, gt_cache_env_name)
+            loads_per_sec = benchmark_load(data_load_func, args.num_episodes)
+            speedup = "" if baseline is None else f" ({res['episodes_per_sec'] / baseline:.2f}x)"
+            baseline = baseline or res["episodes_per_sec"]
+            print(
+                f"{env_name:8s} {mode:10s} {res['episodes_per_sec']:8.1f} episodes/sec{speedup}"
+                f"  {loads_per_sec:8.1f} loads/sec  avg_reward={res['avg_reward']:.3f}"
+                f"  response_cache_hit_rate={get_response_cache_stats().hit_rate:.2f}"
+            )
+        setup = benchmark_setup(env_name, args.num_episodes)
+        print(
+            f"{env_name:8s} setup      get_env {setup['get_env']:.3f} ms/task"
+            f"  EnvFactory.make {setup['factory']:.3f} ms/task"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Copyright Sierra
+
+import argparse
+
+from tau_bench.checkpoint import consolidate_checkpoint, merge_checkpoints
+from tau_bench.metrics import display_metrics
+from tau_bench.types import EnvRunResult
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge the results of the shards of a run and report its metrics"
+    )
+    parser.add_argument(
+        "paths",
+        type=str,
+        nargs="+",
+        help="Results files or JSONL checkpoint logs of the shards",
+    )
+    parser.add_argument(
+        "--output-path",
+        type=str,
+        help="(Optional) path to write the merged results to",
+    )
+    args = parser.parse_args()
+    merged = merge_checkpoints(args.paths)
+    print(f"Merged {len(merged)} episodes from {len(args.paths)} files")
+    display_metrics([EnvRunResult.model_validate(r) for r in merged])
+    if args.output_path is not None:
+        consolidate_checkpoint(merged, args.output_path)
+        print(f"\n📄 Results saved to {args.output_path}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# Copyright Sierra
+
+"""A local stand-in for an OpenAI-compatible chat completions API, for load testing
+`run.py` without network access or token costs.
+
+The agent and user turns are scripted from the historical trajectories and the few-shot
+transcripts. Each conversation is assigned a script by its user instruction, and every
+request returns the next agent (or user) turn of that script, so episodes run to
+completion with realistic message sizes and tool calls. Latency and errors are sampled
+from configurable distributions.
+
+Start the server and point `run.py` at it:
+
+    python mock_llm_server.py --port 8000 --latency-mean 0.5 --rate-limit-rate 0.01
+    OPENAI_API_BASE=http://localhost:8000/v1 OPENAI_API_KEY=mock python run.py \\
+        --model gpt-4o --model-provider openai --user-model gpt-4o \\
+        --user-model-provider openai --env airline --max-concurrency 200
+
+Any model name is answered from the scripts; use one that litellm has prices for, since
+the agents add up the response costs.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LATENCY_DISTRIBUTIONS = ["constant", "exponential", "lognormal"]
+STOP = "###STOP###"
+
+
+class Script(object):
+    """The turns of one recorded conversation: the user's messages and the agent's
+    messages (text or tool calls), in order."""
+
+    def __init__(
+        self, user_turns: List[str], agent_turns: List[Dict[str, Any]]
+    ) -> None:
+        self.user_turns = user_turns
+        self.agent_turns = agent_turns
+
+
+def load_trajectory_scripts(path: str) -> List[Script]:
+    with open(path, "r") as f:
+        results = json.load(f)
+    scripts = []
+    for result in results:
+        user_turns = []
+        agent_turns = []
+        for message in result["traj"]:
+            if message["role"] == "user":
+                user_turns.append(message["content"])
+            elif message["role"] == "assistant":
+                agent_turns.append(
+                    {
+                        "content": message.get("content"),
+                        "tool_calls": message.get("tool_calls"),
+                    }
+                )
+        if len(user_turns) > 0:
+            scripts.append(Script(user_turns, agent_turns))
+    return scripts
+
+
+def load_few_shot_scripts(path: str) -> List[Script]:
+    """Scripts from `messages_display` transcripts. The transcripts do not record the
+    tool calls (they are shown as `assistant: None`), so only the text turns are kept."""
+    scripts = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip() == "":
+                continue
+            display = json.loads(line)["messages_display"]
+            user_turns = []
+            agent_turns = []
+            for role, content in re.findall(
+                r"^(user|assistant|tool): (.*?)(?=\n(?:user|assistant|tool): |\Z)",
+                display,
+                flags=re.M | re.S,
+            ):
+                if role == "user":
+                    user_turns.append(content)
+                elif role == "assistant" and content != "None":
+                    agent_turns.append({"content": content, "tool_calls": None})
+            if len(user_turns) > 0:
+                scripts.append(Script(user_turns, agent_turns))
+    return scripts
+
+
+class ScriptedModel(object):
+    """Generates the next turn of a conversation from its script.
+
+    User simulator requests (a system prompt holding the instruction) are assigned a
+    script by a hash of the system prompt and answered with the script's next user
+    message, then `###STOP###`. Agent requests are matched to a script by their first
+    user message and answered with the script's next agent message, as a tool-calling
+    message if the request has tools and in the ReAct `Action:` format otherwise.
+    """
+
+    def __init__(self, scripts: List[Script]) -> None:
+        assert len(scripts) > 0, "No scripts loaded"
+        self.scripts = scripts
+        self.by_first_user_turn: Dict[str, int] = {}
+        for i, script in enumerate(scripts):
+            self.by_first_user_turn.setdefault(script.user_turns[0].strip(), i)
+
+    def _script_for(self, text: str) -> Script:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return self.scripts[int.from_bytes(digest[:8], "big") % len(self.scripts)]
+
+    def respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        system = next(
+            (m.get("content") or "" for m in messages if m["role"] == "system"), None
+        )
+        if system is None:
+            return self._supervise(messages)
+        turn = sum(1 for m in messages if m["role"] == "assistant")
+        if request.get("tools") or "#Available tools" in system:
+            return self._agent_turn(messages, turn, react=not request.get("tools"))
+        return self._user_turn(system, turn)
+
+    def _user_turn(self, system: str, turn: int) -> Dict[str, Any]:
+        script = self._script_for(system)
+        content = script.user_turns[turn] if turn < len(script.user_turns) else STOP
+        if "User Response:" in system and content != STOP:
+            content = f"User Response:\n{content}"
+        return {"role": "assistant", "content": content}
+
+    def _agent_turn(
+        self, messages: List[Dict[str, Any]], turn: int, react: bool
+    ) -> Dict[str, Any]:
+        first_user_turn = next(
+            (m.get("content") or "" for m in messages if m["role"] == "user"), ""
+        )
+        index = self.by_first_user_turn.get(first_user_turn.strip())
+        script = (
+            self.scripts[index]
+            if index is not None
+            else self._script_for(first_user_turn)
+        )
+        if turn < len(script.agent_turns):
+            message = script.agent_turns[turn]
+        else:
+            message = {
+                "content": "Is there anything else I can help you with?",
+                "tool_calls": None,
+            }
+        if not react:
+            tool_calls = message["tool_calls"]
+            return {
+                "role": "assistant",
+                "content": message["content"],
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                        "type": "function",
+                        "function": tool_call["function"],
+                    }
+                    for tool_call in tool_calls
+                ]
+                if tool_calls
+                else None,
+            }
+        if message["tool_calls"]:
+            function = message["tool_calls"][0]["function"]
+            action = {
+                "name": function["name"],
+                "arguments": json.loads(function["arguments"] or "{}"),
+            }
+        else:
+            action = {"name": "respond", "arguments": {"content": message["content"]}}
+        return {
+            "role": "assistant",
+            "content": f"Thought:\nI follow the policy.\nAction:\n{json.dumps(action)}",
+        }
+
+    def _supervise(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # the verify and reflect prompts of the user simulator
+        prompt = messages[-1].get("content") or "" if len(messages) > 0 else ""
+        if "Reflection:" in prompt:
+            match = re.search(r"# Response:\n(.*?)\n\n# Format:", prompt, flags=re.S)
+            response = match.group(1) if match is not None else STOP
+            return {
+                "role": "assistant",
+                "content": f"Reflection:\nThe response is fine.\n\nResponse:\n{response}",
+            }
+        return {"role": "assistant", "content": "true"}
+
+
+class Faults(object):
+    def __init__(
+        self,
+        latency_distribution: str = "constant",
+        latency_mean: float = 0.0,
+        latency_sigma: float = 0.5,
+        rate_limit_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency_distribution = latency_distribution
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> Tuple[float, Optional[int]]:
+        """A latency in seconds and an HTTP error status, or `None` for success."""
+        with self._lock:
+            if self.latency_mean <= 0 or self.latency_distribution == "constant":
+                latency = max(0.0, self.latency_mean)
+            elif self.latency_distribution == "exponential":
+                latency = self._random.expovariate(1.0 / self.latency_mean)
+            else:
+                # parameterized so that the mean is `latency_mean`
+                mu = math.log(self.latency_mean) - self.latency_sigma**2 / 2
+                latency = self._random.lognormvariate(mu, self.latency_sigma)
+            draw = self._random.random()
+        if draw < self.rate_limit_rate:
+            return latency, 429
+        if draw < self.rate_limit_rate + self.server_error_rate:
+            return latency, 500
+        return latency, None
+
+
+def approx_num_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+class MockCompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    model: ScriptedModel
+    faults: Faults
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(
+                200, {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+            )
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        latency, error = self.faults.sample()
+        time.sleep(latency)
+        if error == 429:
+            self._send_json(
+                429,
+                {
+                    "error": {
+                        "message": "Rate limit reached (mock)",
+                        "type": "rate_limit_error",
+                        "code": "rate_limit_exceeded",
+                    }
+                },
+            )
+            return
+        if error is not None:
+            self._send_json(
+                error, {"error": {"message": "Server error (mock)", "type": "server_error"}}
+            )
+            return
+        message = self.model.respond(request)
+        prompt_tokens = approx_num_tokens(
+            json.dumps(request.get("messages", [])) + json.dumps(request.get("tools", []))
+        )
+        completion_tokens = approx_num_tokens(json.dumps(message))
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls"
+                        if message.get("tool_calls")
+                        else "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+
+class MockServer(ThreadingHTTPServer):
+    # the default backlog of 5 refuses connections under a few hundred concurrent clients
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_server(
+    host: str, port: int, model: ScriptedModel, faults: Faults
+) -> MockServer:
+    handler = type(
+        "Handler", (MockCompletionsHandler,), {"model": model, "faults": faults}
+    )
+    return MockServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--trajectories",
+        type=str,
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(ROOT, "historical_trajectories", "*.json"))),
+        help="Result files whose trajectories are used as scripts",
+    )
+    parser.add_argument(
+        "--few-shot-data",
+        type=str,
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(ROOT, "few_shot_data", "*.jsonl"))),
+        help="Few-shot JSONL files whose transcripts are used as scripts",
+    )
+    parser.add_argument(
+        "--latency-distribution",
+        type=str,
+        default="lognormal",
+        choices=LATENCY_DISTRIBUTIONS,
+    )
+    parser.add_argument(
+        "--latency-mean", type=float, default=0.0, help="Mean latency in seconds"
+    )
+    parser.add_argument(
+        "--latency-sigma",
+        type=float,
+        default=0.5,
+        help="The shape of the lognormal latency distribution",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="The fraction of requests answered with 429",
+    )
+    parser.add_argument(
+        "--server-error-rate",
+        type=float,
+        default=0.0,
+        help="The fraction of requests answered with 500",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    scripts: List[Script] = []
+    for path in args.trajectories:
+        scripts.extend(load_trajectory_scripts(path))
+    for path in args.few_shot_data:
+        scripts.extend(load_few_shot_scripts(path))
+    faults = Faults(
+        latency_distribution=args.latency_distribution,
+        latency_mean=args.latency_mean,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        seed=args.seed,
+    )
+    server = make_server(args.host, args.port, ScriptedModel(scripts), faults)
+    print(
+        f"Serving {len(scripts)} scripts at http://{args.host}:{args.port}/v1/chat/completions"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# Copyright Sierra
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from tau_bench.envs import get_env
+from tau_bench.envs.base import Env
+from tau_bench.envs.gt_cache import get_gt_cache
+
+SPLITS = {
+    "retail": ["train", "test", "dev"],
+    "airline": ["test"],
+}
+
+_env: Optional[Env] = None
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay the ground truth actions of every task without any LLM calls, "
+        "record the ground truth database hashes and report broken tasks."
+    )
+    parser.add_argument("--env", type=str, required=True, choices=["retail", "airline"])
+    parser.add_argument(
+        "--task-split",
+        type=str,
+        nargs="+",
+        choices=["train", "test", "dev"],
+        help="The splits to replay (default: all splits of the environment)",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--output-path",
+        type=str,
+        help="Path to write the ground truth hash index and the report to",
+    )
+    parser.add_argument(
+        "--no-update-cache",
+        action="store_true",
+        help="Do not write the ground truth hashes to the on-disk cache used by calculate_reward",
+    )
+    return parser.parse_args()
+
+
+def init_worker(env_name: str, task_split: str) -> None:
+    global _env
+    _env = get_env(
+        env_name,
+        user_strategy="human",
+        user_model="",
+        task_split=task_split,
+        task_index=0,
+    )
+
+
+def replay_task(task_index: int) -> Dict[str, Any]:
+    assert _env is not None, "init_worker must be called first"
+    env = _env
+    env.task_index = task_index
+    env.task = env.tasks[task_index]
+    env.data = env.data_load_func()
+    fingerprint = env.get_gt_fingerprint(env.data)
+    errors: List[Dict[str, Any]] = []
+    for i, action in enumerate(env.get_gt_actions()):
+        error = None
+        if action.name not in env.tools_map:
+            error = f"Unknown action {action.name}"
+        else:
+            try:
+                observation = env.tools_map[action.name].invoke(
+                    data=env.data, **action.kwargs
+                )
+                if isinstance(observation, str) and observation.startswith("Error"):
+                    error = observation
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        if error is not None:
+            errors.append(
+                {"action_index": i, "action": action.model_dump(), "error": error}
+            )
+    return {
+        "task_id": task_index,
+        "fingerprint": fingerprint,
+        "gt_data_hash": env.get_data_hash(),
+        "gt_merkle_root": env.get_data_merkle_root(),
+        "errors": errors,
+    }
+
+
+def replay_split(
+    env_name: str, task_split: str, max_concurrency: Optional[int]
+) -> List[Dict[str, Any]]:
+    init_worker(env_name, task_split)
+    assert _env is not None
+    task_indices = list(range(len(_env.tasks)))
+    with ProcessPoolExecutor(
+        max_workers=max_concurrency,
+        initializer=init_worker,
+        initargs=(env_name, task_split),
+    ) as executor:
+        chunksize = max(1, len(task_indices) // ((max_concurrency or 8) * 4))
+        return list(executor.map(replay_task, task_indices, chunksize=chunksize))
+
+
+def main() -> None:
+    args = get_args()
+    task_splits = args.task_split or SPLITS[args.env]
+    cache = None if args.no_update_cache else get_gt_cache()
+    output: Dict[str, Any] = {"env": args.env, "splits": {}}
+    num_failed = 0
+    for task_split in task_splits:
+        start = time.perf_counter()
+        results = replay_split(args.env, task_split, args.max_concurrency)
+        elapsed = time.perf_counter() - start
+        failed = [r for r in results if len(r["errors"]) > 0]
+        num_failed += len(failed)
+        print(
+            f"{args.env}/{task_split}: replayed {len(results)} tasks in {elapsed:.2f}s, "
+            f"{len(failed)} with errors"
+        )
+        for r in failed:
+            for error in r["errors"]:
+                print(
+                    f"  task_id={r['task_id']} action {error['action_index']} "
+                    f"({error['action']['name']}): {error['error']}"
+                )
+        if cache is not None:
+            cache.set_many(
+                args.env,
+                task_split,
+                {
+                    r["task_id"]: (
+                        r["fingerprint"],
+                        {
+                            "gt_data_hash": r["gt_data_hash"],
+                            "gt_merkle_root": r["gt_merkle_root"],
+                        },
+                    )
+                    for r in results
+                    if r["fingerprint"] is not None
+                },
+            )
+        output["splits"][task_split] = {
+            "gt_hashes": {
+                str(r["task_id"]): {
+                    "gt_data_hash": r["gt_data_hash"],
+                    "gt_merkle_root": r["gt_merkle_root"],
+                }
+                for r in results
+            },
+            "failures": [
+                {"task_id": r["task_id"], "errors": r["errors"]} for r in failed
+            ],
+        }
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Saved results to {args.output_path}")
+    print(f"{num_failed} tasks with errors in total")
+
+
+if __name__ == "__main__":
+    main()
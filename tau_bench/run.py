@@ -3,6 +3,10 @@
 import argparse
 from tau_bench.types import RunConfig
 from tau_bench.run import run
+from tau_bench.agents.compaction import HISTORY_COMPACTIONS
+from tau_bench.cassette import CASSETTE_MODES
+from tau_bench.checkpoint import COMPRESSIONS
+from tau_bench.scheduling import ORDERINGS
 from litellm import provider_list
 from tau_bench.envs.user import UserStrategy
 
@@ -69,6 +73,97 @@ def parse_args() -> RunConfig:
     parser.add_argument("--shuffle", type=int, default=0)
     parser.add_argument("--user-strategy", type=str, default="llm", choices=[item.value for item in UserStrategy])
     parser.add_argument("--few-shot-displays-path", type=str, help="Path to a jsonlines file containing few shot displays")
+    parser.add_argument(
+        "--checkpoint-compression",
+        type=str,
+        choices=COMPRESSIONS,
+        help="Compress the JSONL checkpoint log written while the run is in progress",
+    )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        help="Path to the results file or JSONL checkpoint log of an interrupted run; only the missing (task, trial) episodes are run and the results are merged",
+    )
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        default="trial",
+        choices=list(ORDERINGS),
+        help="The order in which the (trial, task) episodes of all trials are started from one shared work queue; longest-first starts the tasks that took longest in --schedule-history (and --resume) first",
+    )
+    parser.add_argument(
+        "--schedule-history",
+        type=str,
+        nargs="+",
+        help="(Optional) results files or checkpoint logs of previous runs used to estimate the duration of each task",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=0,
+        help="The shard of the (task, trial) episodes to run, in [0, --num-shards)",
+    )
+    parser.add_argument(
+        "--num-shards",
+        type=int,
+        default=1,
+        help="Split the episodes of the run into this many disjoint shards, e.g. one per machine; combine the results with merge_results.py",
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Admit the LLM requests to each provider/model through an AIMD controller that grows the requests in flight while latency is healthy and backs off (and retries) on rate limits and timeouts, up to --max-concurrency",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=int,
+        help="(Optional) the tokens-per-minute limit of the agent model; requests are admitted through a token bucket using an estimate of their prompt size",
+    )
+    parser.add_argument(
+        "--user-tokens-per-minute",
+        type=int,
+        help="(Optional) the tokens-per-minute limit of the user model",
+    )
+    parser.add_argument(
+        "--cassette",
+        type=str,
+        help="(Optional) path to a JSONL cassette of LLM responses, keyed by a hash of the model, messages, tools and temperature of each request",
+    )
+    parser.add_argument(
+        "--cassette-mode",
+        type=str,
+        default="replay",
+        choices=CASSETTE_MODES,
+        help="Record the responses of the run to --cassette, or replay them from it without calling the models",
+    )
+    parser.add_argument(
+        "--prompt-caching",
+        action="store_true",
+        help="Mark the shared system prompt and the conversation so far as cacheable in requests to Anthropic models (OpenAI caches prompt prefixes automatically); the cached prompt tokens are recorded in each result's info",
+    )
+    parser.add_argument(
+        "--history-compaction",
+        type=str,
+        default="none",
+        choices=HISTORY_COMPACTIONS,
+        help="How the tool-calling, act and react agents shorten the history they send once it exceeds --history-token-budget: elide the oldest tool outputs, or drop the oldest turns",
+    )
+    parser.add_argument(
+        "--history-token-budget",
+        type=int,
+        default=16000,
+        help="The estimated prompt tokens above which the history is compacted",
+    )
+    parser.add_argument(
+        "--use-async",
+        action="store_true",
+        help="Run the episodes as coroutines on one event loop (with at most --max-concurrency in flight) instead of one thread per episode",
+    )
+    parser.add_argument(
+        "--parallel-tool-calls",
+        action="store_true",
+        help="Execute every tool call the model issues in one message (tool-calling and few-shot strategies) instead of only the first one",
+    )
     args = parser.parse_args()
     print(args)
     return RunConfig(
@@ -90,6 +185,22 @@ def parse_args() -> RunConfig:
         shuffle=args.shuffle,
         user_strategy=args.user_strategy,
         few_shot_displays_path=args.few_shot_displays_path,
+        parallel_tool_calls=args.parallel_tool_calls,
+        use_async=args.use_async,
+        checkpoint_compression=args.checkpoint_compression,
+        resume_path=args.resume,
+        schedule=args.schedule,
+        schedule_history_paths=args.schedule_history,
+        shard_index=args.shard_index,
+        num_shards=args.num_shards,
+        adaptive_concurrency=args.adaptive_concurrency,
+        tokens_per_minute=args.tokens_per_minute,
+        user_tokens_per_minute=args.user_tokens_per_minute,
+        cassette_path=args.cassette,
+        cassette_mode=args.cassette_mode,
+        prompt_caching=args.prompt_caching,
+        history_compaction=args.history_compaction,
+        history_token_budget=args.history_token_budget,
     )
 
 
@@ -1,12 +1,14 @@
 # Copyright Sierra
 
 import json
-from litellm import completion
+from tau_bench.llm import acompletion, completion
 
 from tau_bench.agents.base import Agent
+from tau_bench.agents.compaction import HistoryCompactor, PromptCurve
 from tau_bench.envs.base import Env
 from tau_bench.types import (
     Action,
+    EnvResponse,
     SolveResult,
     RESPOND_ACTION_NAME,
     RESPOND_ACTION_FIELD_NAME,
@@ -23,6 +25,7 @@ class ChatReActAgent(Agent):
         provider: str,
         use_reasoning: bool = True,
         temperature: float = 0.0,
+        compactor: Optional[HistoryCompactor] = None,
     ) -> None:
         instruction = REACT_INSTRUCTION if use_reasoning else ACT_INSTRUCTION
         self.prompt = (
@@ -33,6 +36,8 @@ class ChatReActAgent(Agent):
         self.temperature = temperature
         self.use_reasoning = use_reasoning
         self.tools_info = tools_info
+        # what part of the history is sent on each turn (all of it if None)
+        self.compactor = compactor
 
     def generate_next_step(
         self, messages: List[Dict[str, Any]]
@@ -43,6 +48,20 @@ class ChatReActAgent(Agent):
             messages=messages,
             temperature=self.temperature,
         )
+        return self.parse_completion(res)
+
+    async def agenerate_next_step(
+        self, messages: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Action, float]:
+        res = await acompletion(
+            model=self.model,
+            custom_llm_provider=self.provider,
+            messages=messages,
+            temperature=self.temperature,
+        )
+        return self.parse_completion(res)
+
+    def parse_completion(self, res: Any) -> Tuple[Dict[str, Any], Action, float]:
         message = res.choices[0].message
         action_str = message.content.split("Action:")[-1].strip()
         try:
@@ -58,38 +77,84 @@ class ChatReActAgent(Agent):
         action = Action(name=action_parsed["name"], kwargs=action_parsed["arguments"])
         return message.model_dump(), action, res._hidden_params["response_cost"]
 
+    def init_messages(self, obs: str) -> List[Dict[str, Any]]:
+        return [
+            {"role": "system", "content": self.prompt},
+            {"role": "user", "content": obs},
+        ]
+
     def solve(
         self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
     ) -> SolveResult:
         response = env.reset(task_index=task_index)
-        reward = 0.0
-        messages: List[Dict[str, Any]] = [
-            {"role": "system", "content": self.prompt},
-            {"role": "user", "content": response.observation},
-        ]
-        total_cost = 0.0
-        info = {}
+        episode = ChatReActEpisode(self.init_messages(response.observation))
         for _ in range(max_num_steps):
-            message, action, cost = self.generate_next_step(messages)
-            response = env.step(action)
-            obs = response.observation
-            reward = response.reward
-            info = {**info, **response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                obs = "API output: " + obs
-            messages.extend(
-                [
-                    message,
-                    {"role": "user", "content": obs},
-                ]
+            message, action, cost = self.generate_next_step(
+                episode.prompt(self.compactor)
             )
-            total_cost += cost
-            if response.done:
+            if episode.add_step(message, action, cost, env.step(action)):
                 break
+        return episode.to_solve_result()
+
+    async def asolve(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        response = await env.areset(task_index=task_index)
+        episode = ChatReActEpisode(self.init_messages(response.observation))
+        for _ in range(max_num_steps):
+            message, action, cost = await self.agenerate_next_step(
+                episode.prompt(self.compactor)
+            )
+            if episode.add_step(message, action, cost, await env.astep(action)):
+                break
+        return episode.to_solve_result()
+
+
+class ChatReActEpisode(object):
+    """The state of one ReAct conversation, shared by the sync and async loops."""
+
+    def __init__(self, messages: List[Dict[str, Any]]) -> None:
+        self.messages = messages
+        self.info: Dict[str, Any] = {}
+        self.reward = 0.0
+        self.total_cost = 0.0
+        self.prompt_curve = PromptCurve()
+
+    def prompt(
+        self, compactor: Optional[HistoryCompactor] = None
+    ) -> List[Dict[str, Any]]:
+        """The messages to send on this turn."""
+        return self.prompt_curve.prompt(self.messages, compactor)
+
+    def add_step(
+        self,
+        message: Dict[str, Any],
+        action: Action,
+        cost: float,
+        response: EnvResponse,
+    ) -> bool:
+        """Appends the model message and the observation, and returns whether the
+        episode is done."""
+        obs = response.observation
+        self.reward = response.reward
+        self.info = {**self.info, **response.info.model_dump()}
+        if action.name != RESPOND_ACTION_NAME:
+            obs = "API output: " + obs
+        self.messages.extend(
+            [
+                message,
+                {"role": "user", "content": obs},
+            ]
+        )
+        self.total_cost += cost
+        return response.done
+
+    def to_solve_result(self) -> SolveResult:
         return SolveResult(
-            messages=messages,
-            reward=reward,
-            info=info,
+            messages=self.messages,
+            reward=self.reward,
+            info={**self.info, **self.prompt_curve.to_info()},
+            total_cost=self.total_cost,
         )
 
 
@@ -0,0 +1,167 @@
+# Copyright Sierra
+
+import abc
+import json
+from typing import Any, Dict, List, Optional
+
+from tau_bench.token_budget import approx_num_tokens
+
+REACT_OBSERVATION_PREFIX = "API output: "
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return approx_num_tokens(json.dumps(message, default=str))
+
+
+def messages_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def is_tool_output(message: Dict[str, Any]) -> bool:
+    """Whether a message is a tool observation: a tool message of a tool-calling agent,
+    or a ReAct observation fed back as a user message."""
+    if message["role"] == "tool":
+        return True
+    return message["role"] == "user" and str(message.get("content") or "").startswith(
+        REACT_OBSERVATION_PREFIX
+    )
+
+
+class HistoryCompactor(abc.ABC):
+    """Decides which part of an episode's history is sent to the model on each turn.
+
+    `compact` returns the messages to send and leaves the history itself untouched, so
+    the trajectory that is saved and evaluated is always complete.
+    """
+
+    def __init__(self, token_budget: int) -> None:
+        self.token_budget = token_budget
+
+    @abc.abstractmethod
+    def compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class ElideToolOutputs(HistoryCompactor):
+    """Replaces the oldest tool outputs with a short placeholder until the history fits
+    in the token budget. The last `keep_recent` tool outputs, and outputs no longer than
+    their placeholder, are always sent in full."""
+
+    def __init__(self, token_budget: int, keep_recent: int = 2) -> None:
+        super().__init__(token_budget)
+        self.keep_recent = keep_recent
+
+    def compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        tokens = [message_tokens(message) for message in messages]
+        total = sum(tokens)
+        if total <= self.token_budget:
+            return messages
+        outputs = [i for i, message in enumerate(messages) if is_tool_output(message)]
+        stale = outputs[: max(0, len(outputs) - self.keep_recent)]
+        compacted = list(messages)
+        elided = False
+        for i in stale:
+            if total <= self.token_budget:
+                break
+            message = messages[i]
+            content = str(message.get("content") or "")
+            placeholder = f"[{len(content)} characters of tool output elided]"
+            if message["role"] == "user":
+                placeholder = REACT_OBSERVATION_PREFIX + placeholder
+            elided_message = {**message, "content": placeholder}
+            new_tokens = message_tokens(elided_message)
+            if new_tokens >= tokens[i]:
+                continue
+            compacted[i] = elided_message
+            total += new_tokens - tokens[i]
+            elided = True
+        return compacted if elided else messages
+
+
+class DropOldTurns(HistoryCompactor):
+    """Drops the oldest turns until the history fits in the token budget, keeping the
+    system prompt, the user's first message and the latest turn. A turn starts at an
+    agent message and includes the tool outputs or user reply that follow it, so tool
+    calls stay paired with their outputs.
+
+    A note about the omitted messages is appended to the user's first message rather
+    than sent as a system message: several providers reject system messages after the
+    first turn, and the system prompt stays an unchanged, cacheable prefix.
+    """
+
+    def compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        total = messages_tokens(messages)
+        if total <= self.token_budget:
+            return messages
+        starts = [i for i, message in enumerate(messages) if message["role"] == "assistant"]
+        if len(starts) < 2:
+            return messages
+        head = messages[: starts[0]]
+        dropped_until = starts[0]
+        for start, next_start in zip(starts, starts[1:]):
+            if total <= self.token_budget:
+                break
+            total -= messages_tokens(messages[start:next_start])
+            dropped_until = next_start
+        if dropped_until == starts[0]:
+            return messages
+        note = f"[{dropped_until - starts[0]} earlier messages of this conversation were omitted]"
+        last = head[-1] if len(head) > 0 else None
+        if (
+            last is not None
+            and last["role"] == "user"
+            and isinstance(last["content"], str)
+        ):
+            head = [*head[:-1], {**last, "content": f"{last['content']}\n\n{note}"}]
+        else:
+            head = [*head, {"role": "user", "content": note}]
+        return [*head, *messages[dropped_until:]]
+
+
+HISTORY_COMPACTIONS = ["none", "elide-tool-outputs", "drop-old-turns"]
+
+
+def history_compactor(name: str, token_budget: int) -> Optional[HistoryCompactor]:
+    if name == "none":
+        return None
+    elif name == "elide-tool-outputs":
+        return ElideToolOutputs(token_budget)
+    elif name == "drop-old-turns":
+        return DropOldTurns(token_budget)
+    raise ValueError(f"Unknown history compaction: {name}")
+
+
+class PromptCurve(object):
+    """The estimated prompt tokens of each turn of an episode, as sent and as they would
+    have been without compaction. Nothing is recorded without a compactor.
+
+    The history only grows, so the tokens of the full history are kept as a running
+    total and each turn only counts the messages added since the previous one.
+    """
+
+    def __init__(self) -> None:
+        self.sent: List[int] = []
+        self.full: List[int] = []
+        self._counted = 0
+        self._full_tokens = 0
+
+    def prompt(
+        self,
+        messages: List[Dict[str, Any]],
+        compactor: Optional[HistoryCompactor],
+    ) -> List[Dict[str, Any]]:
+        if compactor is None:
+            return messages
+        prompt = compactor.compact(messages)
+        self._full_tokens += messages_tokens(messages[self._counted :])
+        self._counted = len(messages)
+        self.full.append(self._full_tokens)
+        self.sent.append(
+            self._full_tokens if prompt is messages else messages_tokens(prompt)
+        )
+        return prompt
+
+    def to_info(self) -> Dict[str, List[int]]:
+        if len(self.sent) == 0:
+            return {}
+        return {"prompt_tokens_curve": self.sent, "full_prompt_tokens_curve": self.full}
@@ -2,10 +2,11 @@
 
 import json
 import random
-from litellm import completion
+from tau_bench.llm import acompletion, completion, prompt_caching_enabled
 from typing import List, Optional, Dict, Any
 
 from tau_bench.agents.base import Agent
+from tau_bench.agents.tool_calling_agent import ToolCallingEpisode
 from tau_bench.envs.base import Env
 from tau_bench.types import SolveResult, Action, RESPOND_ACTION_NAME
 
@@ -20,6 +21,7 @@ class FewShotToolCallingAgent(Agent):
         few_shot_displays: List[str],
         temperature: float = 0.0,
         num_few_shots: int = 5,
+        parallel_tool_calls: bool = False,
     ):
         self.tools_info = tools_info
         self.wiki = wiki
@@ -32,62 +34,67 @@ class FewShotToolCallingAgent(Agent):
         self.few_shot_displays = few_shot_displays
         self.temperature = temperature
         self.num_few_shots = num_few_shots
-    def solve(
-        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
-    ) -> SolveResult:
+        # execute every tool call of a message instead of only the first one
+        self.parallel_tool_calls = parallel_tool_calls
+    def init_messages(self, obs: str) -> List[Dict[str, Any]]:
         sampled_few_shot_displays = random.sample(self.few_shot_displays, self.num_few_shots)
         few_shots = "\n\n".join([f"Example {i+1}:\n{display}" for i, display in enumerate(sampled_few_shot_displays)])
-        total_cost = 0.0
-        env_reset_res = env.reset(task_index=task_index)
-        obs = env_reset_res.observation
-        info = env_reset_res.info.model_dump()
-        reward = 0.0
-        messages: List[Dict[str, Any]] = [
+        if prompt_caching_enabled():
+            # the examples are sampled per episode, so keep them out of the wiki's
+            # system message to leave it a prefix shared by every episode
+            return [
+                {"role": "system", "content": self.wiki},
+                {"role": "system", "content": few_shots},
+                {"role": "user", "content": obs},
+            ]
+        return [
             {"role": "system", "content": f"{self.wiki}\n\n{few_shots}"},
             {"role": "user", "content": obs},
         ]
+
+    def completion_kwargs(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return dict(
+            messages=messages,
+            model=self.model,
+            custom_llm_provider=self.provider,
+            tools=self.tools_info,
+            temperature=self.temperature,
+        )
+
+    def solve(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        env_reset_res = env.reset(task_index=task_index)
+        episode = ToolCallingEpisode(
+            self.init_messages(env_reset_res.observation),
+            env_reset_res.info.model_dump(),
+            parallel_tool_calls=self.parallel_tool_calls,
+        )
         for _ in range(max_num_steps):
-            res = completion(
-                messages=messages,
-                model=self.model,
-                custom_llm_provider=self.provider,
-                tools=self.tools_info,
-                temperature=self.temperature,
-            )
-            next_message = res.choices[0].message.model_dump()
-            total_cost += res._hidden_params["response_cost"]
-            action = message_to_action(next_message)
-            env_response = env.step(action)
-            reward = env_response.reward
-            info = {**info, **env_response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                next_message["tool_calls"] = next_message["tool_calls"][:1]
-                messages.extend(
-                    [
-                        next_message,
-                        {
-                            "role": "tool",
-                            "tool_call_id": next_message["tool_calls"][0]["id"],
-                            "name": next_message["tool_calls"][0]["function"]["name"],
-                            "content": env_response.observation,
-                        },
-                    ]
-                )
-            else:
-                messages.extend(
-                    [
-                        next_message,
-                        {"role": "user", "content": env_response.observation},
-                    ]
-                )
-            if env_response.done:
+            res = completion(**self.completion_kwargs(episode.messages))
+            actions = episode.add_completion(res)
+            # read-only tool calls of one message run concurrently
+            responses = env.step_many(actions, max_workers=len(actions))
+            if episode.add_env_responses(actions, responses):
                 break
-        return SolveResult(
-            reward=reward,
-            info=info,
-            messages=messages,
-            total_cost=total_cost,
+        return episode.to_solve_result()
+
+    async def asolve(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        env_reset_res = await env.areset(task_index=task_index)
+        episode = ToolCallingEpisode(
+            self.init_messages(env_reset_res.observation),
+            env_reset_res.info.model_dump(),
+            parallel_tool_calls=self.parallel_tool_calls,
         )
+        for _ in range(max_num_steps):
+            res = await acompletion(**self.completion_kwargs(episode.messages))
+            actions = episode.add_completion(res)
+            responses = await env.astep_many(actions, max_workers=len(actions))
+            if episode.add_env_responses(actions, responses):
+                break
+        return episode.to_solve_result()
 
 
 def message_to_action(
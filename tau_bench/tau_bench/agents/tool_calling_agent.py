@@ -1,12 +1,13 @@
 # Copyright Sierra
 
 import json
-from litellm import completion
+from tau_bench.llm import acompletion, completion
 from typing import List, Optional, Dict, Any
 
 from tau_bench.agents.base import Agent
+from tau_bench.agents.compaction import HistoryCompactor, PromptCurve
 from tau_bench.envs.base import Env
-from tau_bench.types import SolveResult, Action, RESPOND_ACTION_NAME
+from tau_bench.types import SolveResult, Action, EnvResponse, RESPOND_ACTION_NAME
 
 
 class ToolCallingAgent(Agent):
@@ -17,66 +18,148 @@ class ToolCallingAgent(Agent):
         model: str,
         provider: str,
         temperature: float = 0.0,
+        parallel_tool_calls: bool = False,
+        compactor: Optional[HistoryCompactor] = None,
     ):
         self.tools_info = tools_info
         self.wiki = wiki
         self.model = model
         self.provider = provider
         self.temperature = temperature
+        # execute every tool call of a message instead of only the first one
+        self.parallel_tool_calls = parallel_tool_calls
+        # what part of the history is sent on each turn (all of it if None)
+        self.compactor = compactor
+
+    def init_messages(self, obs: str) -> List[Dict[str, Any]]:
+        return [
+            {"role": "system", "content": self.wiki},
+            {"role": "user", "content": obs},
+        ]
+
+    def completion_kwargs(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return dict(
+            messages=messages,
+            model=self.model,
+            custom_llm_provider=self.provider,
+            tools=self.tools_info,
+            temperature=self.temperature,
+        )
 
     def solve(
         self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 50
     ) -> SolveResult:
-        total_cost = 0.0
         env_reset_res = env.reset(task_index=task_index)
-        obs = env_reset_res.observation
-        info = env_reset_res.info.model_dump()
-        reward = 0.0
-        messages: List[Dict[str, Any]] = [
-            {"role": "system", "content": self.wiki},
-            {"role": "user", "content": obs},
-        ]
+        episode = ToolCallingEpisode(
+            self.init_messages(env_reset_res.observation),
+            env_reset_res.info.model_dump(),
+            parallel_tool_calls=self.parallel_tool_calls,
+        )
         for _ in range(max_num_steps):
             res = completion(
-                messages=messages,
-                model=self.model,
-                custom_llm_provider=self.provider,
-                tools=self.tools_info,
-                temperature=self.temperature,
+                **self.completion_kwargs(episode.prompt(self.compactor))
             )
-            next_message = res.choices[0].message.model_dump()
-            total_cost += res._hidden_params["response_cost"]
-            action = message_to_action(next_message)
-            env_response = env.step(action)
-            reward = env_response.reward
-            info = {**info, **env_response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                next_message["tool_calls"] = next_message["tool_calls"][:1]
-                messages.extend(
-                    [
-                        next_message,
-                        {
-                            "role": "tool",
-                            "tool_call_id": next_message["tool_calls"][0]["id"],
-                            "name": next_message["tool_calls"][0]["function"]["name"],
-                            "content": env_response.observation,
-                        },
-                    ]
-                )
-            else:
-                messages.extend(
-                    [
-                        next_message,
-                        {"role": "user", "content": env_response.observation},
-                    ]
-                )
-            if env_response.done:
+            actions = episode.add_completion(res)
+            # read-only tool calls of one message run concurrently
+            responses = env.step_many(actions, max_workers=len(actions))
+            if episode.add_env_responses(actions, responses):
+                break
+        return episode.to_solve_result()
+
+    async def asolve(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 50
+    ) -> SolveResult:
+        env_reset_res = await env.areset(task_index=task_index)
+        episode = ToolCallingEpisode(
+            self.init_messages(env_reset_res.observation),
+            env_reset_res.info.model_dump(),
+            parallel_tool_calls=self.parallel_tool_calls,
+        )
+        for _ in range(max_num_steps):
+            res = await acompletion(
+                **self.completion_kwargs(episode.prompt(self.compactor))
+            )
+            actions = episode.add_completion(res)
+            responses = await env.astep_many(actions, max_workers=len(actions))
+            if episode.add_env_responses(actions, responses):
                 break
+        return episode.to_solve_result()
+
+
+class ToolCallingEpisode(object):
+    """The state of one tool-calling conversation, shared by the sync and async loops."""
+
+    def __init__(
+        self,
+        messages: List[Dict[str, Any]],
+        info: Dict[str, Any],
+        parallel_tool_calls: bool = False,
+    ) -> None:
+        self.messages = messages
+        self.info = info
+        self.parallel_tool_calls = parallel_tool_calls
+        self.reward = 0.0
+        self.total_cost = 0.0
+        self.turns_saved = 0
+        self.next_message: Dict[str, Any] = {}
+        self.prompt_curve = PromptCurve()
+
+    def prompt(
+        self, compactor: Optional[HistoryCompactor] = None
+    ) -> List[Dict[str, Any]]:
+        """The messages to send on this turn."""
+        return self.prompt_curve.prompt(self.messages, compactor)
+
+    def add_completion(self, res: Any) -> List[Action]:
+        self.next_message = res.choices[0].message.model_dump()
+        self.total_cost += res._hidden_params["response_cost"]
+        if self.parallel_tool_calls:
+            return message_to_actions(self.next_message)
+        return [message_to_action(self.next_message)]
+
+    def add_env_responses(
+        self, actions: List[Action], env_responses: List[EnvResponse]
+    ) -> bool:
+        """Appends the model message and the observations, and returns whether the
+        episode is done."""
+        next_message = self.next_message
+        for env_response in env_responses:
+            self.reward = env_response.reward
+            self.info = {**self.info, **env_response.info.model_dump()}
+        if actions[0].name != RESPOND_ACTION_NAME:
+            # keep only the tool calls that were executed, one tool message per call
+            next_message["tool_calls"] = next_message["tool_calls"][: len(env_responses)]
+            self.turns_saved += len(env_responses) - 1
+            self.messages.append(next_message)
+            self.messages.extend(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "name": tool_call["function"]["name"],
+                    "content": env_response.observation,
+                }
+                for tool_call, env_response in zip(
+                    next_message["tool_calls"], env_responses
+                )
+            )
+        else:
+            self.messages.extend(
+                [
+                    next_message,
+                    {"role": "user", "content": env_responses[0].observation},
+                ]
+            )
+        return env_responses[-1].done
+
+    def to_solve_result(self) -> SolveResult:
+        if self.parallel_tool_calls:
+            self.info["turns_saved"] = self.turns_saved
+        self.info.update(self.prompt_curve.to_info())
         return SolveResult(
-            reward=reward,
-            info=info,
-            messages=messages,
-            total_cost=total_cost,
+            reward=self.reward,
+            info=self.info,
+            messages=self.messages,
+            total_cost=self.total_cost,
         )
 
 
@@ -91,3 +174,20 @@ def message_to_action(
         )
     else:
         return Action(name=RESPOND_ACTION_NAME, kwargs={"content": message["content"]})
+
+
+def message_to_actions(
+    message: Dict[str, Any],
+) -> List[Action]:
+    tool_calls = message.get("tool_calls") or []
+    if len(tool_calls) > 0 and all(
+        tool_call["function"] is not None for tool_call in tool_calls
+    ):
+        return [
+            Action(
+                name=tool_call["function"]["name"],
+                kwargs=json.loads(tool_call["function"]["arguments"]),
+            )
+            for tool_call in tool_calls
+        ]
+    return [message_to_action(message)]
@@ -0,0 +1,95 @@
+# Copyright Sierra
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List
+
+from litellm import ModelResponse
+
+CASSETTE_MODES = ["record", "replay"]
+
+
+class CassetteMissError(Exception):
+    pass
+
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    """A stable hash of the parts of a completion request that determine its response."""
+    request = {
+        "model": kwargs.get("model"),
+        "custom_llm_provider": kwargs.get("custom_llm_provider"),
+        "messages": kwargs.get("messages"),
+        "tools": kwargs.get("tools"),
+        "temperature": kwargs.get("temperature"),
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class Cassette(object):
+    """Records completion responses to a JSONL file and replays them by request key.
+
+    The same request can be recorded more than once (e.g. in several trials at a nonzero
+    temperature); replaying it returns the recorded responses in order, and then keeps
+    returning the last one. Replaying a request that was never recorded raises
+    `CassetteMissError`. Recording appends to an existing cassette.
+    """
+
+    def __init__(self, path: str, mode: str = "replay") -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.positions: Dict[str, int] = {}
+        self.hits = 0
+        self._lock = threading.Lock()
+        if mode == "replay" or os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r") as f:
+            for line in f:
+                if line.strip() == "":
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a line cut short while recording
+                    break
+                self.entries.setdefault(entry["key"], []).append(entry)
+
+    def replay(self, kwargs: Dict[str, Any]) -> ModelResponse:
+        key = request_key(kwargs)
+        with self._lock:
+            entries = self.entries.get(key)
+            if entries is None:
+                raise CassetteMissError(
+                    f"No recorded response for this {kwargs.get('model')} request in {self.path}"
+                )
+            position = self.positions.get(key, 0)
+            entry = entries[min(position, len(entries) - 1)]
+            self.positions[key] = position + 1
+            self.hits += 1
+        res = ModelResponse(**entry["response"])
+        res._hidden_params = {
+            **res._hidden_params,
+            "response_cost": entry["response_cost"],
+        }
+        return res
+
+    def record(self, kwargs: Dict[str, Any], res: ModelResponse) -> None:
+        entry = {
+            "key": request_key(kwargs),
+            "model": kwargs.get("model"),
+            "response": res.model_dump(),
+            "response_cost": res._hidden_params.get("response_cost"),
+        }
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            self.entries.setdefault(entry["key"], []).append(entry)
+            with open(self.path, "a") as f:
+                f.write(line)
@@ -0,0 +1,171 @@
+# Copyright Sierra
+
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+COMPRESSIONS = ["gzip"]
+
+_CLOSE = object()
+
+
+def jsonl_checkpoint_path(ckpt_path: str, compression: Optional[str] = None) -> str:
+    """The path of the append-only log that backs the JSON checkpoint `ckpt_path`."""
+    root, _ = os.path.splitext(ckpt_path)
+    return f"{root}.jsonl.gz" if compression == "gzip" else f"{root}.jsonl"
+
+
+def resume_checkpoint_paths(
+    path: str, compression: Optional[str] = None
+) -> Tuple[str, Optional[str]]:
+    """The JSON checkpoint path and log compression to continue writing to when resuming
+    from `path`, which is either a consolidated JSON checkpoint or a JSONL log."""
+    if path.endswith(".jsonl.gz"):
+        return path[: -len(".jsonl.gz")] + ".json", compression or "gzip"
+    if path.endswith(".jsonl"):
+        return path[: -len(".jsonl")] + ".json", compression
+    return path, compression
+
+
+def write_checkpoint_log(
+    results: List[Dict[str, Any]], path: str, compression: Optional[str] = None
+) -> None:
+    """Atomically replaces the checkpoint log at `path` with `results`."""
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wb") if compression == "gzip" else open(
+        tmp_path, "wb"
+    ) as f:
+        for result in results:
+            f.write((json.dumps(result) + "\n").encode("utf-8"))
+    os.replace(tmp_path, path)
+
+
+class CheckpointWriter(object):
+    """Appends one JSON line per result to a checkpoint log from a background thread.
+
+    `append` only enqueues the result, so workers never wait on disk I/O or on each other.
+    The writer thread writes whatever is queued and flushes the file whenever the queue
+    runs dry, and at least every `flush_interval` seconds while it does not, so after a
+    crash the log holds every result up to the last flush. With `compression="gzip"` each flush ends a
+    complete deflate block, so the log stays readable up to that point.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compression: Optional[str] = None,
+        flush_interval: float = 1.0,
+    ) -> None:
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown checkpoint compression: {compression}")
+        self.path = path
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._file: IO[bytes] = (
+            gzip.open(path, "ab") if compression == "gzip" else open(path, "ab")
+        )
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, result: Dict[str, Any]) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Checkpoint writer failed: {self._error}")
+        self._queue.put(result)
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            last_flush = time.monotonic()
+            while item is not _CLOSE:
+                self._write(item)
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush()
+                    last_flush = time.monotonic()
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._flush()
+            if item is _CLOSE:
+                return
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        try:
+            self._file.write((json.dumps(result) + "\n").encode("utf-8"))
+        except BaseException as e:
+            self._error = e
+
+    def _flush(self) -> None:
+        try:
+            self._file.flush()
+        except BaseException as e:
+            self._error = e
+
+    def close(self) -> None:
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._file.close()
+        if self._error is not None:
+            raise RuntimeError(f"Checkpoint writer failed: {self._error}")
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def read_checkpoint(path: str) -> List[Dict[str, Any]]:
+    """Reads the results of a checkpoint: a consolidated JSON list, or a (possibly
+    gzipped) JSONL log. A line cut short by a crash at the end of a log is ignored."""
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            return json.load(f)
+    results = []
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        try:
+            for line in f:
+                if line.strip() == "":
+                    continue
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        except EOFError:
+            # a gzip stream whose last block was not completed
+            pass
+    return results
+
+
+def consolidate_checkpoint(results: List[Dict[str, Any]], ckpt_path: str) -> None:
+    """Writes the results in the consolidated JSON layout read by existing consumers."""
+    tmp_path = f"{ckpt_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, ckpt_path)
+
+
+def merge_checkpoints(paths: List[str]) -> List[Dict[str, Any]]:
+    """Combines the results of several checkpoints, e.g. the shards of one run, ordered by
+    (trial, task_id). If an episode appears more than once, a result without an error
+    takes precedence over one with an error, and otherwise the last one read is kept."""
+    merged: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for path in paths:
+        for result in read_checkpoint(path):
+            key = (result["trial"], result["task_id"])
+            existing = merged.get(key)
+            if (
+                existing is not None
+                and "error" not in existing["info"]
+                and "error" in result["info"]
+            ):
+                continue
+            merged[key] = result
+    return [merged[key] for key in sorted(merged)]
@@ -0,0 +1,170 @@
+# Copyright Sierra
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+class ConcurrencyStats(BaseModel):
+    limit: float
+    max_limit_reached: float
+    requests: int
+    congestion_events: int
+    backoffs: int
+
+
+class AIMDController(object):
+    """Bounds the number of requests in flight to one model with additive-increase,
+    multiplicative-decrease control.
+
+    The limit starts at `initial_limit` and grows by one per successful request (doubling
+    every round trip) until the first congestion signal, then by `1 / limit` per success
+    (one per round trip). A rate limit or timeout multiplies it by `decrease_factor`, at
+    most once per round trip so a burst of 429s from one window counts as one event.
+    While the smoothed latency exceeds `latency_tolerance` times its minimum over the last
+    `latency_window` successes, the limit is held instead of grown: a sustained rise in
+    latency (requests queueing at the provider) pauses growth, while noise in the latency
+    of individual requests, which varies a lot with prompt and output length, does not.
+    Blocking (`acquire`) and coroutine (`aacquire`) callers share the same limit.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_window: int = 100,
+    ) -> None:
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_window = latency_window
+        self.in_flight = 0
+        self.slow_start = True
+        self.smoothed_latency: Optional[float] = None
+        # (success number, smoothed latency) pairs with increasing latencies, whose
+        # first element is the minimum of the window
+        self._latency_minima: Deque[Tuple[int, float]] = deque()
+        self._successes = 0
+        self.last_decrease = float("-inf")
+        self.requests = 0
+        self.congestion_events = 0
+        self.backoffs = 0
+        self.max_limit_reached = self.limit
+        self._cond = threading.Condition()
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = (
+            deque()
+        )
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquire(self) -> None:
+        with self._cond:
+            while not self._has_capacity():
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._has_capacity():
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, latency: Optional[float] = None, congested: bool = False) -> None:
+        """Frees a slot and updates the limit with the outcome of the request: its
+        latency if it succeeded, or `congested=True` if it was rate limited or timed
+        out."""
+        with self._cond:
+            self.in_flight -= 1
+            self.requests += 1
+            if congested:
+                self._on_congestion()
+            elif latency is not None:
+                self._on_success(latency)
+            self._cond.notify_all()
+            waiters = list(self._async_waiters)
+            self._async_waiters.clear()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_resolve, waiter)
+
+    def _on_success(self, latency: float) -> None:
+        self.smoothed_latency = (
+            latency
+            if self.smoothed_latency is None
+            else 0.8 * self.smoothed_latency + 0.2 * latency
+        )
+        self._successes += 1
+        minima = self._latency_minima
+        while len(minima) > 0 and minima[-1][1] >= self.smoothed_latency:
+            minima.pop()
+        minima.append((self._successes, self.smoothed_latency))
+        if minima[0][0] <= self._successes - self.latency_window:
+            minima.popleft()
+        if self.smoothed_latency > self.latency_tolerance * minima[0][1]:
+            return
+        self.limit += 1.0 if self.slow_start else 1.0 / self.limit
+        self.limit = min(self.limit, float(self.max_limit))
+        self.max_limit_reached = max(self.max_limit_reached, self.limit)
+
+    def _on_congestion(self) -> None:
+        self.congestion_events += 1
+        self.slow_start = False
+        now = time.monotonic()
+        if now - self.last_decrease < (self.smoothed_latency or 0.0):
+            return
+        self.last_decrease = now
+        self.backoffs += 1
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+    def stats(self) -> ConcurrencyStats:
+        with self._cond:
+            return ConcurrencyStats(
+                limit=self.limit,
+                max_limit_reached=self.max_limit_reached,
+                requests=self.requests,
+                congestion_events=self.congestion_events,
+                backoffs=self.backoffs,
+            )
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ConcurrencyControllers(object):
+    """One `AIMDController` per (provider, model), created on first use."""
+
+    def __init__(self, **controller_kwargs: Any) -> None:
+        self.controller_kwargs = controller_kwargs
+        self._controllers: Dict[Tuple[str, str], AIMDController] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: Optional[str], model: str) -> AIMDController:
+        key = (provider or "", model)
+        with self._lock:
+            if key not in self._controllers:
+                self._controllers[key] = AIMDController(**self.controller_kwargs)
+            return self._controllers[key]
+
+    def stats(self) -> Dict[str, ConcurrencyStats]:
+        with self._lock:
+            controllers = dict(self._controllers)
+        return {
+            f"{provider}/{model}" if provider else model: controller.stats()
+            for (provider, model), controller in controllers.items()
+        }
@@ -3,6 +3,7 @@
 from typing import Optional, Union
 from tau_bench.envs.base import Env
 from tau_bench.envs.user import UserStrategy
+from tau_bench.envs.factory import EnvFactory as EnvFactory
 
 
 def get_env(
@@ -2,12 +2,15 @@
 
 import json
 import os
-from typing import Any
+from typing import Any, MutableMapping
+
+from tau_bench.envs.airline.inventory import ColumnarFlightTable
+from tau_bench.envs.snapshot import get_snapshot
 
 FOLDER_PATH = os.path.dirname(__file__)
 
 
-def load_data() -> dict[str, Any]:
+def read_data() -> dict[str, Any]:
     with open(os.path.join(FOLDER_PATH, "flights.json")) as f:
         flight_data = json.load(f)
     with open(os.path.join(FOLDER_PATH, "reservations.json")) as f:
@@ -19,3 +22,15 @@ def load_data() -> dict[str, Any]:
         "reservations": reservation_data,
         "users": user_data,
     }
+
+
+def load_data() -> MutableMapping[str, Any]:
+    return get_snapshot("airline", read_data).overlay()
+
+
+def load_columnar_data() -> MutableMapping[str, Any]:
+    """Like `load_data`, but with the seats, prices and statuses of the flights stored in
+    a columnar `FlightInventory`."""
+    data = get_snapshot("airline", read_data).overlay()
+    data["flights"] = ColumnarFlightTable.from_overlay(data["flights"])
+    return data
@@ -1,10 +1,13 @@
 # Copyright Sierra
 
-from tau_bench.envs.airline.data import load_data
+import os
+
+from tau_bench.envs.airline.data import load_columnar_data, load_data
 from tau_bench.envs.airline.rules import RULES
 from tau_bench.envs.airline.tools import ALL_TOOLS
 from tau_bench.envs.airline.wiki import WIKI
 from tau_bench.envs.base import Env
+from tau_bench.envs.task_store import load_tasks
 from typing import Optional, Union
 from tau_bench.envs.user import UserStrategy
 
@@ -18,13 +21,10 @@ class MockAirlineDomainEnv(Env):
         task_split: str = "test",
         task_index: Optional[int] = None,
     ):
-        match task_split:
-            case "test":
-                from tau_bench.envs.airline.tasks_test import TASKS as tasks
-            case _:
-                raise ValueError(f"Unknown task split: {task_split}")
+        tasks = load_tasks("airline", task_split)
+        columnar = os.environ.get("TAU_BENCH_AIRLINE_BACKEND", "dict") == "columnar"
         super().__init__(
-            data_load_func=load_data,
+            data_load_func=load_columnar_data if columnar else load_data,
             tools=ALL_TOOLS,
             tasks=tasks,
             wiki=WIKI,
@@ -33,5 +33,16 @@ class MockAirlineDomainEnv(Env):
             user_model=user_model,
             user_provider=user_provider,
             task_index=task_index,
+            env_name="airline",
+            task_split=task_split,
         )
         self.terminate_tools = ["transfer_to_human_agents"]
+        self.read_only_tools = [
+            "calculate",
+            "get_reservation_details",
+            "get_user_details",
+            "list_all_airports",
+            "search_direct_flight",
+            "search_onestop_flight",
+            "think",
+        ]
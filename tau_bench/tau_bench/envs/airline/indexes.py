@@ -0,0 +1,31 @@
+# Copyright Sierra
+
+from datetime import date as Date, timedelta
+
+from tau_bench.envs.index import MultiRecordIndex
+
+
+def _available_dates(flight):
+    return [
+        date for date, info in flight["dates"].items() if info["status"] == "available"
+    ]
+
+
+# (origin, destination, date) -> flights on the route that are available on the date
+ROUTES_BY_DATE = MultiRecordIndex(
+    "routes_by_date",
+    lambda flight: [
+        (flight["origin"], flight["destination"], date)
+        for date in _available_dates(flight)
+    ],
+)
+
+# (origin, date) -> flights departing from the origin that are available on the date
+DEPARTURES_BY_DATE = MultiRecordIndex(
+    "departures_by_date",
+    lambda flight: [(flight["origin"], date) for date in _available_dates(flight)],
+)
+
+
+def next_day(date: str) -> str:
+    return (Date.fromisoformat(date) + timedelta(days=1)).isoformat()
@@ -0,0 +1,451 @@
+# Copyright Sierra
+
+import copy
+import numbers
+import threading
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tau_bench.envs.overlay import OverlayTable, copy_record
+
+CABINS = ("basic_economy", "economy", "business")
+# date entry field -> inventory array
+CABIN_FIELDS = {"available_seats": "seats", "prices": "prices"}
+NO_ENTRY = -1
+
+_build_lock = threading.Lock()
+
+
+class FlightInventory(object):
+    """The seat counts, prices and statuses of every flight on every date, stored in
+    NumPy arrays indexed by flight x date (x cabin).
+
+    `status` holds an index into `statuses` (or `NO_ENTRY` if the flight has no entry on
+    the date), `seats` and `prices` hold one column per cabin in `CABINS`. The remaining
+    fields of a date entry (e.g. the actual departure time) are kept in `entries` along
+    with the key order of the entry, so the entry can be rebuilt exactly.
+
+    One inventory is built per snapshot and shared; `copy()` returns a per-episode
+    inventory whose arrays are copied on its first write, after which every update is an
+    O(1) write in place.
+    """
+
+    def __init__(self, flights: Mapping) -> None:
+        self.flight_numbers: List[str] = list(flights)
+        self.flight_index = {fn: i for i, fn in enumerate(self.flight_numbers)}
+        self.dates: List[str] = sorted(
+            {date for flight in flights.values() for date in flight["dates"]}
+        )
+        self.date_index = {date: i for i, date in enumerate(self.dates)}
+        self.statuses: List[str] = []
+        self.status_codes: Dict[str, int] = {}
+        shape = (len(self.flight_numbers), len(self.dates))
+        self.status = np.full(shape, NO_ENTRY, dtype=np.int16)
+        self.seats = np.zeros(shape + (len(CABINS),), dtype=np.int64)
+        self.prices = np.zeros(shape + (len(CABINS),), dtype=np.int64)
+        # per flight, the indices of its dates in record order
+        self.flight_dates: List[List[int]] = [[] for _ in self.flight_numbers]
+        # (flight index, date index) -> (keys of the entry, fields other than the columns)
+        self.entries: Dict[Tuple[int, int], Tuple[Tuple[str, ...], Dict[str, Any]]] = {}
+        self._owned = True
+        for fi, flight in enumerate(flights.values()):
+            self.set_dates(fi, flight["dates"])
+
+    def copy(self) -> "FlightInventory":
+        inventory = copy.copy(self)
+        inventory._owned = False
+        return inventory
+
+    def _writable(self) -> None:
+        if self._owned:
+            return
+        self.statuses = list(self.statuses)
+        self.status_codes = dict(self.status_codes)
+        self.status = self.status.copy()
+        self.seats = self.seats.copy()
+        self.prices = self.prices.copy()
+        self.flight_dates = [list(dates) for dates in self.flight_dates]
+        self.entries = dict(self.entries)
+        self._owned = True
+
+    def _column(self, field: str) -> np.ndarray:
+        return getattr(self, CABIN_FIELDS[field])
+
+    def require_date(self, date: str) -> int:
+        if date not in self.date_index:
+            raise ValueError(f"Date {date} is outside of the flight inventory")
+        return self.date_index[date]
+
+    def _status_code(self, status: str) -> int:
+        if status not in self.status_codes:
+            self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return self.status_codes[status]
+
+    def has_entry(self, fi: int, di: int) -> bool:
+        return self.status[fi, di] != NO_ENTRY
+
+    def entry_dates(self, fi: int) -> List[int]:
+        return [di for di in self.flight_dates[fi] if self.status[fi, di] != NO_ENTRY]
+
+    def get_status(self, fi: int, di: int) -> str:
+        return self.statuses[self.status[fi, di]]
+
+    def get_cabins(self, field: str, fi: int, di: int) -> List[int]:
+        return self._column(field)[fi, di].tolist()
+
+    def set_status(self, fi: int, di: int, status: str) -> None:
+        self._writable()
+        self.status[fi, di] = self._status_code(status)
+
+    def set_cabin(self, field: str, fi: int, di: int, cabin: str, value: int) -> None:
+        _check_cabin_value(field, value)
+        self._writable()
+        self._column(field)[fi, di, CABINS.index(cabin)] = value
+
+    def set_cabins(self, field: str, fi: int, di: int, values: Mapping) -> None:
+        if tuple(values) != CABINS:
+            raise ValueError(f"{field} must have exactly the cabins {CABINS}")
+        for cabin in CABINS:
+            _check_cabin_value(field, values[cabin])
+        self._writable()
+        self._column(field)[fi, di] = [values[cabin] for cabin in CABINS]
+        keys, extras = self.entries[(fi, di)]
+        if field not in keys:
+            self.entries[(fi, di)] = (keys + (field,), extras)
+
+    def set_entry(self, fi: int, di: int, entry: Mapping) -> None:
+        keys = tuple(entry)
+        if len(keys) == 0 or keys[0] != "status":
+            raise ValueError("A flight date entry must start with its status")
+        self._writable()
+        if di not in self.flight_dates[fi]:
+            self.flight_dates[fi].append(di)
+        self.status[fi, di] = self._status_code(entry["status"])
+        self.entries[(fi, di)] = (
+            keys,
+            {
+                k: copy_record(v)
+                for k, v in entry.items()
+                if k != "status" and k not in CABIN_FIELDS
+            },
+        )
+        for field in CABIN_FIELDS:
+            if field in entry:
+                self.set_cabins(field, fi, di, entry[field])
+            else:
+                self._column(field)[fi, di] = 0
+
+    def set_field(self, fi: int, di: int, key: str, value: Any) -> None:
+        self._writable()
+        keys, extras = self.entries[(fi, di)]
+        extras = dict(extras)
+        extras[key] = value
+        self.entries[(fi, di)] = (keys if key in keys else keys + (key,), extras)
+
+    def delete_field(self, fi: int, di: int, key: str) -> None:
+        if key == "status":
+            raise TypeError("The status of a flight date entry cannot be removed")
+        self._writable()
+        keys, extras = self.entries[(fi, di)]
+        if key not in keys:
+            raise KeyError(key)
+        extras = {k: v for k, v in extras.items() if k != key}
+        self.entries[(fi, di)] = (tuple(k for k in keys if k != key), extras)
+        if key in CABIN_FIELDS:
+            self._column(key)[fi, di] = 0
+
+    def delete_entry(self, fi: int, di: int) -> None:
+        self._writable()
+        self.status[fi, di] = NO_ENTRY
+        self.flight_dates[fi] = [d for d in self.flight_dates[fi] if d != di]
+        self.entries.pop((fi, di), None)
+
+    def set_dates(self, fi: int, dates: Mapping) -> None:
+        # read the new entries first, as they may be views of the entries being replaced
+        new_entries = [
+            (
+                self.require_date(date),
+                entry.to_dict() if isinstance(entry, FlightDateView) else entry,
+            )
+            for date, entry in dates.items()
+        ]
+        self._writable()
+        for di in list(self.flight_dates[fi]):
+            self.delete_entry(fi, di)
+        for di, entry in new_entries:
+            self.set_entry(fi, di, entry)
+
+    def available_flights(
+        self,
+        date: str,
+        cabin: Optional[str] = None,
+        max_price: Optional[int] = None,
+        min_seats: int = 1,
+    ) -> List[str]:
+        """The flight numbers, in table order, that are available on `date` with at least
+        `min_seats` seats for at most `max_price` in `cabin` (or in any cabin)."""
+        if date not in self.date_index:
+            return []
+        di = self.date_index[date]
+        if "available" not in self.status_codes:
+            return []
+        mask = self.status[:, di] == self.status_codes["available"]
+        cabins = slice(None) if cabin is None else [CABINS.index(cabin)]
+        ok = self.seats[:, di, cabins] >= min_seats
+        if max_price is not None:
+            ok &= self.prices[:, di, cabins] <= max_price
+        mask &= ok.any(axis=1)
+        return [self.flight_numbers[fi] for fi in np.flatnonzero(mask)]
+
+
+def _check_cabin_value(field: str, value: Any) -> None:
+    # the columns are integer arrays, which would silently truncate anything else
+    if not isinstance(value, numbers.Integral) or isinstance(value, bool):
+        raise TypeError(
+            f"The columnar inventory only stores whole numbers in {field}, got {value!r}"
+        )
+
+
+class _CabinValues(dict):
+    """A cabin -> value dict that writes through to the inventory. It is a real dict, so
+    it can be serialized and hashed as is."""
+
+    def __init__(self, inventory: FlightInventory, field: str, fi: int, di: int) -> None:
+        super().__init__(zip(CABINS, inventory.get_cabins(field, fi, di)))
+        self._location = (inventory, field, fi, di)
+
+    def __setitem__(self, cabin: str, value: int) -> None:
+        inventory, field, fi, di = self._location
+        if cabin not in CABINS:
+            raise KeyError(cabin)
+        inventory.set_cabin(field, fi, di, cabin, value)
+        super().__setitem__(cabin, value)
+
+    def __delitem__(self, cabin: str) -> None:
+        raise TypeError("Cabins cannot be removed from the flight inventory")
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for cabin, value in dict(*args, **kwargs).items():
+            self[cabin] = value
+
+
+class FlightDateView(MutableMapping):
+    """The entry of one flight on one date (`flight["dates"][date]`)."""
+
+    def __init__(self, inventory: FlightInventory, fi: int, di: int) -> None:
+        self._inventory = inventory
+        self._fi = fi
+        self._di = di
+
+    def _keys(self) -> Tuple[str, ...]:
+        return self._inventory.entries[(self._fi, self._di)][0]
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "status":
+            return self._inventory.get_status(self._fi, self._di)
+        if key not in self._keys():
+            raise KeyError(key)
+        if key in CABIN_FIELDS:
+            return _CabinValues(self._inventory, key, self._fi, self._di)
+        return self._inventory.entries[(self._fi, self._di)][1][key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "status":
+            self._inventory.set_status(self._fi, self._di, value)
+        elif key in CABIN_FIELDS:
+            self._inventory.set_cabins(key, self._fi, self._di, value)
+        else:
+            self._inventory.set_field(self._fi, self._di, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self._inventory.delete_field(self._fi, self._di, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            key: dict(value) if isinstance(value, _CabinValues) else copy_record(value)
+            for key, value in self.items()
+        }
+
+
+class FlightDatesView(MutableMapping):
+    """The date entries of one flight (`flight["dates"]`)."""
+
+    def __init__(self, inventory: FlightInventory, fi: int) -> None:
+        self._inventory = inventory
+        self._fi = fi
+
+    def __getitem__(self, date: str) -> FlightDateView:
+        di = self._inventory.date_index.get(date)
+        if di is None or not self._inventory.has_entry(self._fi, di):
+            raise KeyError(date)
+        return FlightDateView(self._inventory, self._fi, di)
+
+    def __contains__(self, date: object) -> bool:
+        di = self._inventory.date_index.get(date)  # type: ignore[call-overload]
+        return di is not None and self._inventory.has_entry(self._fi, di)
+
+    def __setitem__(self, date: str, entry: Mapping) -> None:
+        self._inventory.set_entry(self._fi, self._inventory.require_date(date), entry)
+
+    def __delitem__(self, date: str) -> None:
+        if date not in self:
+            raise KeyError(date)
+        self._inventory.delete_entry(self._fi, self._inventory.date_index[date])
+
+    def __iter__(self) -> Iterator[str]:
+        dates = self._inventory.dates
+        return iter([dates[di] for di in self._inventory.entry_dates(self._fi)])
+
+    def __len__(self) -> int:
+        return len(self._inventory.entry_dates(self._fi))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {date: self[date].to_dict() for date in self}
+
+
+class FlightView(MutableMapping):
+    """A flight record whose `dates` live in a `FlightInventory`. The other fields are
+    read from the shared base record until one of them is assigned."""
+
+    def __init__(
+        self,
+        inventory: FlightInventory,
+        fi: int,
+        fields: Dict[str, Any],
+        owns_fields: bool = False,
+    ) -> None:
+        self._inventory = inventory
+        self._fi = fi
+        # the fields in record order, with a placeholder for `dates`
+        self._fields = fields
+        self._owns_fields = owns_fields
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "dates":
+            return FlightDatesView(self._inventory, self._fi)
+        return self._fields[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "dates":
+            self._inventory.set_dates(self._fi, value)
+            return
+        if not self._owns_fields:
+            self._fields = dict(self._fields)
+            self._owns_fields = True
+        self._fields[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key == "dates":
+            raise TypeError("The dates of a flight cannot be removed")
+        if not self._owns_fields:
+            self._fields = dict(self._fields)
+            self._owns_fields = True
+        del self._fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            key: self["dates"].to_dict() if key == "dates" else copy_record(value)
+            for key, value in self._fields.items()
+        }
+
+
+class ColumnarFlightTable(OverlayTable):
+    """A copy-on-write `flights` table backed by a `FlightInventory`.
+
+    Indexing a flight returns a `FlightView`, which behaves like the flight's dict (so the
+    tools and the data hash work unchanged) but reads and writes seats, prices and
+    statuses in the episode's inventory instead of copying the record. Flights that are
+    added to the table are stored as plain dicts and are not part of the inventory.
+    """
+
+    def __init__(
+        self,
+        base: Dict[str, Any],
+        base_hashes: Optional[Any] = None,
+        base_cache: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(base, base_hashes=base_hashes, base_cache=base_cache)
+        inventory = self.base_cache.get("inventory")
+        if inventory is None:
+            with _build_lock:
+                inventory = self.base_cache.get("inventory")
+                if inventory is None:
+                    inventory = FlightInventory(base)
+                    self.base_cache["inventory"] = inventory
+        self.inventory = inventory.copy()
+
+    @classmethod
+    def from_overlay(cls, table: OverlayTable) -> "ColumnarFlightTable":
+        return cls(table.base, base_hashes=table.base_hashes, base_cache=table.base_cache)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._overlay:
+            self.serialized.pop(key, None)
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        fields = {k: None if k == "dates" else v for k, v in self._base[key].items()}
+        record = FlightView(self.inventory, self.inventory.flight_index[key], fields)
+        self._overlay[key] = record
+        return record
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.inventory.flight_index and not isinstance(value, FlightView):
+            # store the dates of a replaced flight in the inventory as well
+            fi = self.inventory.flight_index[key]
+            self.inventory.set_dates(fi, value.get("dates", {}))
+            fields = {k: None if k == "dates" else v for k, v in value.items()}
+            value = FlightView(self.inventory, fi, fields, owns_fields=True)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        fi = self.inventory.flight_index.get(key)
+        if fi is not None:
+            for di in self.inventory.entry_dates(fi):
+                self.inventory.delete_entry(fi, di)
+
+    def update_seats(self, flight_number: str, date: str, cabin: str, delta: int) -> int:
+        """Adds `delta` to the seats left in a cabin in place and returns the new count."""
+        record = self[flight_number]
+        if not isinstance(record, FlightView):
+            seats = record["dates"][date]["available_seats"]
+            seats[cabin] += delta
+            return seats[cabin]
+        fi = self.inventory.flight_index[flight_number]
+        di = self.inventory.require_date(date)
+        seats = int(self.inventory.seats[fi, di, CABINS.index(cabin)]) + delta
+        self.inventory.set_cabin("available_seats", fi, di, cabin, seats)
+        return seats
+
+    def available_flights(
+        self,
+        date: str,
+        cabin: Optional[str] = None,
+        max_price: Optional[int] = None,
+        min_seats: int = 1,
+    ) -> List[str]:
+        return self.inventory.available_flights(
+            date, cabin=cabin, max_price=max_price, min_seats=min_seats
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            key: value.to_dict() if isinstance(value, FlightView) else copy_record(value)
+            for key, value in self.items()
+        }
@@ -1,7 +1,7 @@
 # Copyright Sierra
 
-import json
 from typing import Any, Dict
+from tau_bench.envs.response_cache import dump_record
 from tau_bench.envs.tool import Tool
 
 
@@ -10,7 +10,7 @@ class GetUserDetails(Tool):
     def invoke(data: Dict[str, Any], user_id: str) -> str:
         users = data["users"]
         if user_id in users:
-            return json.dumps(users[user_id])
+            return dump_record(users, user_id)
         return "Error: user not found"
 
     @staticmethod
@@ -1,25 +1,49 @@
 # Copyright Sierra
 
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from tau_bench.envs.airline.indexes import ROUTES_BY_DATE
+from tau_bench.envs.index import peek
+from tau_bench.envs.pagination import Page, is_paginated, page_parameters
 from tau_bench.envs.tool import Tool
 
 
+def flight_on_date(flights: Dict[str, Any], flight_number: str, date: str) -> Dict[str, Any]:
+    flight = peek(flights, flight_number)
+    # the flight except dates, with flight["dates"][date]
+    result = {k: v for k, v in flight.items() if k != "dates"}
+    result.update(flight["dates"][date])
+    return result
+
+
 class SearchDirectFlight(Tool):
     @staticmethod
-    def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
+    def invoke(
+        data: Dict[str, Any],
+        origin: str,
+        destination: str,
+        date: str,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> str:
         flights = data["flights"]
-        results = []
-        for flight in flights.values():
-            if flight["origin"] == origin and flight["destination"] == destination:
-                if (
-                    date in flight["dates"]
-                    and flight["dates"][date]["status"] == "available"
-                ):
-                    # results add flight except dates, but add flight["datas"][date]
-                    results.append({k: v for k, v in flight.items() if k != "dates"})
-                    results[-1].update(flight["dates"][date])
-        return json.dumps(results)
+        flight_numbers = ROUTES_BY_DATE.lookup(flights, (origin, destination, date))
+        if not is_paginated(page_size, cursor):
+            return json.dumps(
+                [
+                    flight_on_date(flights, flight_number, date)
+                    for flight_number in flight_numbers
+                ]
+            )
+        try:
+            page = Page(page_size, cursor)
+        except ValueError as e:
+            return f"Error: {e}"
+        results, next_cursor = page.take(
+            sorted(flight_numbers),
+            lambda flight_number: flight_on_date(flights, flight_number, date),
+        )
+        return json.dumps({"results": results, "next_cursor": next_cursor})
 
     @staticmethod
     def get_info() -> Dict[str, Any]:
@@ -43,6 +67,7 @@ class SearchDirectFlight(Tool):
                             "type": "string",
                             "description": "The date of the flight in the format 'YYYY-MM-DD', such as '2024-01-01'.",
                         },
+                        **page_parameters(),
                     },
                     "required": ["origin", "destination", "date"],
                 },
@@ -1,49 +1,100 @@
 # Copyright Sierra
 
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from tau_bench.envs.airline.indexes import (
+    DEPARTURES_BY_DATE,
+    ROUTES_BY_DATE,
+    next_day,
+)
+from tau_bench.envs.airline.tools.search_direct_flight import flight_on_date
+from tau_bench.envs.index import peek
+from tau_bench.envs.pagination import Page, is_paginated, page_parameters
 from tau_bench.envs.tool import Tool
 
 
+def connections(
+    flights: Dict[str, Any],
+    origin: str,
+    destination: str,
+    date: str,
+    ordered: bool = False,
+    first_after: Optional[str] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """The (first flight, second flight, date of the second flight) of every one-stop
+    connection, in flight number order if `ordered`, starting from the first flight
+    `first_after`."""
+    flight_numbers1 = DEPARTURES_BY_DATE.lookup(flights, (origin, date))
+    if ordered:
+        flight_numbers1 = sorted(flight_numbers1)
+    for flight_number1 in flight_numbers1:
+        if first_after is not None and flight_number1 < first_after:
+            continue
+        flight1 = peek(flights, flight_number1)
+        date2 = (
+            next_day(date) if "+1" in flight1["scheduled_arrival_time_est"] else date
+        )
+        flight_numbers2 = ROUTES_BY_DATE.lookup(
+            flights, (flight1["destination"], destination, date2)
+        )
+        if ordered:
+            flight_numbers2 = sorted(flight_numbers2)
+        for flight_number2 in flight_numbers2:
+            flight2 = peek(flights, flight_number2)
+            if (
+                flight1["scheduled_arrival_time_est"]
+                > flight2["scheduled_departure_time_est"]
+            ):
+                continue
+            yield flight_number1, flight_number2, date2
+
+
 class SearchOnestopFlight(Tool):
     @staticmethod
-    def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
+    def invoke(
+        data: Dict[str, Any],
+        origin: str,
+        destination: str,
+        date: str,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> str:
         flights = data["flights"]
-        results = []
-        for flight1 in flights.values():
-            if flight1["origin"] == origin:
-                for flight2 in flights.values():
-                    if (
-                        flight2["destination"] == destination
-                        and flight1["destination"] == flight2["origin"]
-                    ):
-                        date2 = (
-                            f"2024-05-{int(date[-2:])+1}"
-                            if "+1" in flight1["scheduled_arrival_time_est"]
-                            else date
-                        )
-                        if (
-                            flight1["scheduled_arrival_time_est"]
-                            > flight2["scheduled_departure_time_est"]
-                        ):
-                            continue
-                        if date in flight1["dates"] and date2 in flight2["dates"]:
-                            if (
-                                flight1["dates"][date]["status"] == "available"
-                                and flight2["dates"][date2]["status"] == "available"
-                            ):
-                                result1 = {
-                                    k: v for k, v in flight1.items() if k != "dates"
-                                }
-                                result1.update(flight1["dates"][date])
-                                result1["date"] = date
-                                result2 = {
-                                    k: v for k, v in flight2.items() if k != "dates"
-                                }
-                                result2.update(flight2["dates"][date])
-                                result2["date"] = date2
-                                results.append([result1, result2])
-        return json.dumps(results)
+
+        def connection(
+            flight_number1: str, flight_number2: str, date2: str
+        ) -> List[Dict[str, Any]]:
+            result1 = flight_on_date(flights, flight_number1, date)
+            result1["date"] = date
+            result2 = flight_on_date(flights, flight_number2, date2)
+            result2["date"] = date2
+            return [result1, result2]
+
+        if not is_paginated(page_size, cursor):
+            return json.dumps(
+                [
+                    connection(*key)
+                    for key in connections(flights, origin, destination, date)
+                ]
+            )
+        try:
+            # the sort key of a connection is (first flight, second flight, date of the
+            # second flight)
+            page = Page(page_size, cursor, key_size=3)
+        except ValueError as e:
+            return f"Error: {e}"
+        results, next_cursor = page.take(
+            connections(
+                flights,
+                origin,
+                destination,
+                date,
+                ordered=True,
+                first_after=page.after[0] if page.after is not None else None,
+            ),
+            lambda key: connection(*key),
+        )
+        return json.dumps({"results": results, "next_cursor": next_cursor})
 
     @staticmethod
     def get_info() -> Dict[str, Any]:
@@ -67,6 +118,7 @@ class SearchOnestopFlight(Tool):
                             "type": "string",
                             "description": "The date of the flight in the format 'YYYY-MM-DD', such as '2024-05-01'.",
                         },
+                        **page_parameters(),
                     },
                     "required": ["origin", "destination", "date"],
                 },
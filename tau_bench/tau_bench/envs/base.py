@@ -1,9 +1,30 @@
 # Copyright Sierra
 
 import random
-from hashlib import sha256
+from concurrent.futures import ThreadPoolExecutor
 from tau_bench.envs.tool import Tool
-from typing import Any, Callable, Dict, List, Type, Optional, Set, Union, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Type,
+    Optional,
+    Union,
+    Sequence,
+    Tuple,
+)
+
+from tau_bench.envs.data_hash import (
+    Hashable as Hashable,
+    ToHashable as ToHashable,
+    consistent_hash as consistent_hash,
+    data_hash,
+    merkle_root,
+    to_hashable as to_hashable,
+)
+from tau_bench.envs.gt_cache import compute_fingerprint, get_gt_cache
 
 from tau_bench.envs.user import load_user, UserStrategy
 from tau_bench.types import (
@@ -18,43 +39,25 @@ from tau_bench.types import (
     RESPOND_ACTION_NAME,
 )
 
-ToHashable = Union[
-    str, int, float, Dict[str, "ToHashable"], List["ToHashable"], Set["ToHashable"]
-]
-Hashable = Union[str, int, float, Tuple["Hashable"], Tuple[Tuple[str, "Hashable"]]]
-
-
-def to_hashable(item: ToHashable) -> Hashable:
-    if isinstance(item, dict):
-        return tuple((key, to_hashable(value)) for key, value in sorted(item.items()))
-    elif isinstance(item, list):
-        return tuple(to_hashable(element) for element in item)
-    elif isinstance(item, set):
-        return tuple(sorted(to_hashable(element) for element in item))
-    else:
-        return item
-
-
-def consistent_hash(
-    value: Hashable,
-) -> str:
-    return sha256(str(value).encode("utf-8")).hexdigest()
-
 
 class Env(object):
     def __init__(
         self,
-        data_load_func: Callable[[], Dict[str, Any]],
+        data_load_func: Callable[[], MutableMapping[str, Any]],
         tools: List[Type[Tool]],
-        tasks: List[Task],
+        tasks: Sequence[Task],
         wiki: str,
         rules: List[str],
         user_strategy: Union[str, UserStrategy],
         user_model: str,
         user_provider: Optional[str] = None,
         task_index: Optional[int] = None,
+        env_name: Optional[str] = None,
+        task_split: Optional[str] = None,
     ) -> None:
         super().__init__()
+        self.env_name = env_name
+        self.task_split = task_split
         self.data_load_func = data_load_func
         self.data = data_load_func()
         self.tools_map: Dict[str, Type[Tool]] = {
@@ -62,6 +65,8 @@ class Env(object):
         }
         self.tools_info = [tool.get_info() for tool in tools]
         self.terminate_tools = []
+        # tools that never modify `data`, which `step_many` may run concurrently
+        self.read_only_tools: List[str] = []
         self.tasks = tasks
         if task_index is not None:
             self.task_index = task_index
@@ -75,35 +80,56 @@ class Env(object):
         )
         self.actions: List[Action] = []
 
-    def reset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+    def _reset_task(self, task_index: Optional[int]) -> None:
         if task_index is None:
             task_index = random.randint(0, len(self.tasks))
         self.task_index = task_index
         self.data = self.data_load_func()
         self.task = self.tasks[task_index]
         self.actions = []
+
+    def reset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+        self._reset_task(task_index)
         initial_observation = self.user.reset(instruction=self.task.instruction)
         return EnvResetResponse(
             observation=initial_observation, info=EnvInfo(task=self.task, source="user")
         )
 
+    async def areset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+        self._reset_task(task_index)
+        initial_observation = await self.user.areset(instruction=self.task.instruction)
+        return EnvResetResponse(
+            observation=initial_observation, info=EnvInfo(task=self.task, source="user")
+        )
+
     def step(self, action: Action) -> EnvResponse:
         self.actions.append(action)
+        user_observation = None
+        if action.name == RESPOND_ACTION_NAME:
+            user_observation = self.user.step(action.kwargs["content"])
+        return self._finish_step(action, user_observation)
 
+    async def astep(self, action: Action) -> EnvResponse:
+        """Like `step`, but awaits the user simulator instead of blocking on it."""
+        self.actions.append(action)
+        user_observation = None
+        if action.name == RESPOND_ACTION_NAME:
+            user_observation = await self.user.astep(action.kwargs["content"])
+        return self._finish_step(action, user_observation)
+
+    def _finish_step(
+        self, action: Action, user_observation: Optional[str]
+    ) -> EnvResponse:
         info = EnvInfo(task=self.task)
         reward = 0
         done = False
         if action.name == RESPOND_ACTION_NAME:
-            observation = self.user.step(action.kwargs["content"])
+            assert user_observation is not None
+            observation = user_observation
             info.source = "user"
             done = "###STOP###" in observation
         elif action.name in self.tools_map:
-            try:
-                observation = self.tools_map[action.name].invoke(
-                    data=self.data, **action.kwargs
-                )
-            except Exception as e:
-                observation = f"Error: {e}"
+            observation = self.invoke_tool(action)
             info.source = action.name
             if action.name in self.terminate_tools:
                 done = True
@@ -118,25 +144,127 @@ class Env(object):
             info.user_cost = self.user.get_total_cost()
         return EnvResponse(observation=observation, reward=reward, done=done, info=info)
 
+    def invoke_tool(self, action: Action) -> str:
+        try:
+            return self.tools_map[action.name].invoke(data=self.data, **action.kwargs)
+        except Exception as e:
+            return f"Error: {e}"
+
+    def step_many(
+        self, actions: List[Action], max_workers: Optional[int] = None
+    ) -> List[EnvResponse]:
+        """Executes a batch of actions in order against the current data and returns one
+        response per executed action. The batch stops after the first action that ends
+        the episode, so the result may be shorter than `actions`.
+
+        If every action is a call to one of `read_only_tools` and `max_workers` is greater
+        than one, the tools are invoked concurrently; the actions are still recorded and
+        answered in order.
+        """
+        read_only = len(actions) > 1 and all(
+            action.name in self.read_only_tools for action in actions
+        )
+        if not read_only or max_workers is None or max_workers <= 1:
+            responses = []
+            for action in actions:
+                response = self.step(action)
+                responses.append(response)
+                if response.done:
+                    break
+            return responses
+        self.actions.extend(actions)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(actions))) as executor:
+            observations = list(executor.map(self.invoke_tool, actions))
+        return [
+            EnvResponse(
+                observation=observation,
+                reward=0,
+                done=False,
+                info=EnvInfo(task=self.task, source=action.name),
+            )
+            for action, observation in zip(actions, observations)
+        ]
+
+    async def astep_many(
+        self, actions: List[Action], max_workers: Optional[int] = None
+    ) -> List[EnvResponse]:
+        """Like `step_many`, but awaits the user simulator for respond actions."""
+        if all(action.name != RESPOND_ACTION_NAME for action in actions):
+            return self.step_many(actions, max_workers=max_workers)
+        responses = []
+        for action in actions:
+            response = await self.astep(action)
+            responses.append(response)
+            if response.done:
+                break
+        return responses
+
     def get_data_hash(self) -> str:
-        return consistent_hash(to_hashable(self.data))
+        return data_hash(self.data)
+
+    def get_data_merkle_root(self) -> str:
+        return merkle_root(self.data)
+
+    def get_gt_actions(self) -> List[Action]:
+        return [
+            action
+            for action in self.task.actions
+            if action.name not in self.terminate_tools
+        ]
+
+    def get_gt_fingerprint(self, data: MutableMapping[str, Any]) -> Optional[str]:
+        """The ground truth cache fingerprint of the current task, or None if `data` is
+        not loaded from a snapshot or the env is not named."""
+        data_digest = getattr(data, "base_digest", None)
+        if data_digest is None or self.env_name is None or self.task_split is None:
+            return None
+        return compute_fingerprint(
+            data_digest, list(self.tools_map.values()), self.get_gt_actions()
+        )
+
+    def get_gt_data_hashes(self) -> Tuple[str, str]:
+        """Returns the data hash and Merkle root of the database after the ground truth
+        actions of the current task, from the on-disk cache when possible. The ground
+        truth is replayed on a fresh copy of the data, so the env's own data and actions
+        are left as the agent's either way."""
+        data = self.data_load_func()
+        cache = get_gt_cache()
+        fingerprint = self.get_gt_fingerprint(data) if cache is not None else None
+        if fingerprint is not None:
+            entry = cache.get(self.env_name, self.task_split, self.task_index, fingerprint)
+            if entry is not None:
+                return entry["gt_data_hash"], entry["gt_merkle_root"]
+
+        for action in self.get_gt_actions():
+            # only tool calls change the data
+            if action.name in self.tools_map:
+                try:
+                    self.tools_map[action.name].invoke(data=data, **action.kwargs)
+                except Exception:
+                    pass
+        gt_data_hash = data_hash(data)
+        gt_merkle_root = merkle_root(data)
+        if fingerprint is not None:
+            cache.set(
+                self.env_name,
+                self.task_split,
+                self.task_index,
+                fingerprint,
+                {"gt_data_hash": gt_data_hash, "gt_merkle_root": gt_merkle_root},
+            )
+        return gt_data_hash, gt_merkle_root
 
     def calculate_reward(self) -> RewardResult:
-        data_hash = self.get_data_hash()
+        data_root = self.get_data_merkle_root()
         reward = 1.0
         actions = [
             action for action in self.task.actions if action.name != RESPOND_ACTION_NAME
         ]
 
         # Check if the database changes are correct. If they are not correct, then we set the reward to 0.
-        # TODO: cache gt_data_hash in tasks.py (low priority)
-        self.data = self.data_load_func()
-        for action in self.task.actions:
-            if action.name not in self.terminate_tools:
-                self.step(action)
-        gt_data_hash = self.get_data_hash()
+        gt_data_hash, gt_merkle_root = self.get_gt_data_hashes()
         info = RewardActionInfo(
-            r_actions=data_hash == gt_data_hash, gt_data_hash=gt_data_hash
+            r_actions=data_root == gt_merkle_root, gt_data_hash=gt_data_hash
         )
         if not info.r_actions:
             reward = 0.0
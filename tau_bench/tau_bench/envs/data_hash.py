@@ -0,0 +1,148 @@
+# Copyright Sierra
+
+from collections.abc import Mapping
+from hashlib import sha256
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from tau_bench.envs.overlay import OverlayTable
+
+ToHashable = Union[
+    str, int, float, Dict[str, "ToHashable"], List["ToHashable"], Set["ToHashable"]
+]
+Hashable = Union[str, int, float, Tuple["Hashable"], Tuple[Tuple[str, "Hashable"]]]
+
+
+def to_hashable(item: ToHashable) -> Hashable:
+    if isinstance(item, Mapping):
+        return tuple((key, to_hashable(value)) for key, value in sorted(item.items()))
+    elif isinstance(item, list):
+        return tuple(to_hashable(element) for element in item)
+    elif isinstance(item, set):
+        return tuple(sorted(to_hashable(element) for element in item))
+    else:
+        return item
+
+
+def consistent_hash(
+    value: Hashable,
+) -> str:
+    return sha256(str(value).encode("utf-8")).hexdigest()
+
+
+def record_fragment(key: str, record: Any) -> bytes:
+    # the text of the `(key, record)` pair inside `str(to_hashable(data))`
+    return repr((key, to_hashable(record))).encode("utf-8")
+
+
+class RecordHashCache(object):
+    """Per-record hash fragments and digests of a read-only base table.
+
+    The base is shared by every episode (see `OverlayTable`), so each record is rendered
+    and hashed at most once per process.
+    """
+
+    def __init__(self, table: Mapping) -> None:
+        self._table = table
+        self._fragments: Dict[str, bytes] = {}
+        self._digests: Dict[str, bytes] = {}
+        self._table_digest: Optional[str] = None
+
+    def fragment(self, key: str) -> bytes:
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = record_fragment(key, self._table[key])
+            self._fragments[key] = fragment
+        return fragment
+
+    def digest(self, key: str) -> bytes:
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = sha256(self.fragment(key)).digest()
+            self._digests[key] = digest
+        return digest
+
+    def table_digest(self) -> str:
+        if self._table_digest is None:
+            hasher = sha256()
+            for key in sorted(self._table):
+                hasher.update(self.digest(key))
+            self._table_digest = hasher.hexdigest()
+        return self._table_digest
+
+
+def _iter_record_fragments(table: Mapping) -> Iterator[Tuple[str, bytes, bool]]:
+    # yields (key, fragment, is_cached) in `to_hashable` order
+    if isinstance(table, OverlayTable) and table.base_hashes is not None:
+        touched = table.touched_keys()
+        for key in sorted(table):
+            if key in touched:
+                yield key, record_fragment(key, table.peek(key)), False
+            else:
+                yield key, table.base_hashes.fragment(key), True
+    else:
+        for key in sorted(table):
+            yield key, record_fragment(key, table[key]), False
+
+
+def _iter_tuple_repr(parts: Iterator[bytes]) -> Iterator[bytes]:
+    # streams `repr(tuple(...))` given the reprs of the elements
+    yield b"("
+    count = 0
+    for part in parts:
+        if count > 0:
+            yield b", "
+        yield part
+        count += 1
+    if count == 1:
+        yield b","
+    yield b")"
+
+
+def _iter_table_repr(name: str, table: Any) -> Iterator[bytes]:
+    if not isinstance(table, Mapping):
+        yield record_fragment(name, table)
+        return
+    yield b"(" + repr(name).encode("utf-8") + b", "
+    yield from _iter_tuple_repr(
+        fragment for _, fragment, _ in _iter_record_fragments(table)
+    )
+    yield b")"
+
+
+def data_hash(data: Mapping) -> str:
+    """Equal to `consistent_hash(to_hashable(data))`, but reuses the cached fragments of
+    records that no tool has touched."""
+    hasher = sha256()
+    tables = (b"".join(_iter_table_repr(name, data[name])) for name in sorted(data))
+    for piece in _iter_tuple_repr(tables):
+        hasher.update(piece)
+    return hasher.hexdigest()
+
+
+def table_digest(table: Any) -> str:
+    if not isinstance(table, Mapping):
+        return sha256(repr(to_hashable(table)).encode("utf-8")).hexdigest()
+    base_hashes = table.base_hashes if isinstance(table, OverlayTable) else None
+    if base_hashes is not None and not table.touched_keys():
+        return base_hashes.table_digest()
+    hasher = sha256()
+    for key, fragment, is_cached in _iter_record_fragments(table):
+        if is_cached:
+            hasher.update(base_hashes.digest(key))
+        else:
+            hasher.update(sha256(fragment).digest())
+    return hasher.hexdigest()
+
+
+def table_digests(data: Mapping) -> Dict[str, str]:
+    return {name: table_digest(data[name]) for name in sorted(data)}
+
+
+def merkle_root(data: Mapping) -> str:
+    """A root over per-table digests, which are in turn over per-record digests. Two
+    databases have the same root iff they have the same `data_hash`."""
+    hasher = sha256()
+    for name, digest in table_digests(data).items():
+        hasher.update(sha256(repr(name).encode("utf-8")).digest())
+        hasher.update(bytes.fromhex(digest))
+    return hasher.hexdigest()
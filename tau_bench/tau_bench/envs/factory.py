@@ -0,0 +1,67 @@
+# Copyright Sierra
+
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from tau_bench.envs.base import Env
+from tau_bench.envs.user import UserStrategy, load_user
+from tau_bench.types import Task
+
+
+class EnvFactory(object):
+    """Builds one environment per run and hands out isolated episodes from it.
+
+    The tool registry (`tools_map` / `tools_info`), the task set and the data snapshot are
+    built once by the template environment and shared by every episode; each episode only
+    gets its own copy-on-write database, action log and user simulator.
+    """
+
+    def __init__(
+        self,
+        env_name: str,
+        user_strategy: Union[str, UserStrategy],
+        user_model: str,
+        task_split: str,
+        user_provider: Optional[str] = None,
+    ) -> None:
+        from tau_bench.envs import get_env
+
+        self.env_name = env_name
+        self.user_strategy = user_strategy
+        self.user_model = user_model
+        self.user_provider = user_provider
+        self.task_split = task_split
+        self.template = get_env(
+            env_name,
+            user_strategy=user_strategy,
+            user_model=user_model,
+            task_split=task_split,
+            user_provider=user_provider,
+            task_index=0,
+        )
+
+    @property
+    def tasks(self) -> Sequence[Task]:
+        return self.template.tasks
+
+    @property
+    def tools_info(self) -> List[Dict[str, Any]]:
+        return self.template.tools_info
+
+    @property
+    def wiki(self) -> str:
+        return self.template.wiki
+
+    def make(self, task_index: Optional[int] = None) -> Env:
+        env = copy.copy(self.template)
+        env.data = env.data_load_func()
+        env.actions = []
+        env.user = load_user(
+            user_strategy=self.user_strategy,
+            model=self.user_model,
+            provider=self.user_provider,
+        )
+        if task_index is not None:
+            env.task_index = task_index
+            env.task = env.tasks[task_index]
+        return env
@@ -0,0 +1,175 @@
+# Copyright Sierra
+
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import threading
+from hashlib import sha256
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from tau_bench.envs.tool import Tool
+from tau_bench.types import Action
+
+CACHE_DIR_ENV_VAR = "TAU_BENCH_CACHE_DIR"
+DISABLE_ENV_VAR = "TAU_BENCH_DISABLE_GT_CACHE"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tau_bench")
+
+# bump when the layout of the cache or the meaning of its entries changes
+GT_CACHE_VERSION = 2
+
+# modules outside the tool modules whose code affects how the ground truth is replayed,
+# what the tools do to the data or how the data is hashed; they are read from disk, so
+# the optional ones (e.g. the columnar airline inventory) are not imported
+TOOL_HELPER_MODULES = [
+    "tau_bench.envs.base",
+    "tau_bench.envs.data_hash",
+    "tau_bench.envs.index",
+    "tau_bench.envs.overlay",
+    "tau_bench.envs.pagination",
+    "tau_bench.envs.response_cache",
+    "tau_bench.envs.airline.indexes",
+    "tau_bench.envs.airline.inventory",
+    "tau_bench.envs.retail.indexes",
+    "tau_bench.envs.tool",
+]
+
+_tools_digests: Dict[tuple, str] = {}
+
+
+def get_cache_dir() -> str:
+    return os.environ.get(CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR)
+
+
+def tools_digest(tools: Sequence[Type[Tool]]) -> str:
+    """A digest of the source code of the modules that define `tools` and of the
+    `TOOL_HELPER_MODULES`."""
+    key = tuple(sorted(tools, key=lambda tool: tool.__qualname__))
+    if key not in _tools_digests:
+        hasher = sha256()
+        for tool in key:
+            hasher.update(tool.__qualname__.encode("utf-8"))
+            hasher.update(inspect.getsource(sys.modules[tool.__module__]).encode("utf-8"))
+        for name in TOOL_HELPER_MODULES:
+            hasher.update(name.encode("utf-8"))
+            hasher.update(_module_source(name))
+        _tools_digests[key] = hasher.hexdigest()
+    return _tools_digests[key]
+
+
+def _module_source(name: str) -> bytes:
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.origin is None:
+        return b""
+    with open(spec.origin, "rb") as f:
+        return f.read()
+
+
+def actions_digest(actions: List[Action]) -> str:
+    return sha256(
+        json.dumps([action.model_dump() for action in actions], sort_keys=True).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+
+class GroundTruthCache(object):
+    """An on-disk cache of ground truth database hashes, one JSON file per entry.
+
+    Entries are keyed by env, split, task index and a fingerprint of the data, the tool
+    source code and the task's actions, so entries made stale by a change to any of them
+    are never read. Each entry is written to its own file with an atomic rename, so
+    concurrent runs and shards never overwrite each other's entries. The cache is best
+    effort: I/O errors are not raised.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self.cache_dir = cache_dir or get_cache_dir()
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _path(
+        self, env_name: str, task_split: str, task_index: int, fingerprint: str
+    ) -> str:
+        return os.path.join(
+            self.cache_dir,
+            "gt_hashes",
+            f"{env_name}-{task_split}",
+            f"{task_index}-{fingerprint}.json",
+        )
+
+    def get(
+        self, env_name: str, task_split: str, task_index: int, fingerprint: str
+    ) -> Optional[Dict[str, str]]:
+        path = self._path(env_name, task_split, task_index, fingerprint)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None:
+            return entry
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def set(
+        self,
+        env_name: str,
+        task_split: str,
+        task_index: int,
+        fingerprint: str,
+        value: Dict[str, str],
+    ) -> None:
+        path = self._path(env_name, task_split, task_index, fingerprint)
+        with self._lock:
+            self._entries[path] = value
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def set_many(
+        self,
+        env_name: str,
+        task_split: str,
+        values: Dict[int, Tuple[str, Dict[str, str]]],
+    ) -> None:
+        for task_index, (fingerprint, value) in values.items():
+            self.set(env_name, task_split, task_index, fingerprint, value)
+
+
+_default_cache: Optional[GroundTruthCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_gt_cache() -> Optional[GroundTruthCache]:
+    global _default_cache
+    if os.environ.get(DISABLE_ENV_VAR):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GroundTruthCache()
+        return _default_cache
+
+
+def compute_fingerprint(
+    data_digest: str, tools: Sequence[Type[Tool]], actions: List[Action]
+) -> str:
+    return sha256(
+        "\n".join(
+            [
+                str(GT_CACHE_VERSION),
+                data_digest,
+                tools_digest(tools),
+                actions_digest(actions),
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
@@ -0,0 +1,121 @@
+# Copyright Sierra
+
+import threading
+from collections.abc import Hashable, Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tau_bench.envs.overlay import OverlayTable
+
+_build_lock = threading.Lock()
+
+
+def peek(table: Mapping, key: str) -> Any:
+    """Reads a record without copying it into the episode's overlay. The record must be
+    treated as read-only."""
+    if isinstance(table, OverlayTable):
+        return table.peek(key)
+    return table[key]
+
+
+class RecordIndex(object):
+    """A secondary index from a value derived from each record of a table to the keys of
+    the records, in table order.
+
+    The index over the shared base of an `OverlayTable` is built once per snapshot and
+    stored in the table's `base_cache`. Records that an episode has touched (indexed,
+    added or deleted) are re-evaluated on every lookup, so the index stays consistent
+    with tools that mutate records in place. Plain dict tables are scanned.
+    """
+
+    def __init__(self, name: str, key_func: Callable[[Any], Hashable]) -> None:
+        self.name = name
+        self.key_func = key_func
+
+    def values(self, record: Any) -> Tuple[Hashable, ...]:
+        return (self.key_func(record),)
+
+    def _base_index(
+        self, table: OverlayTable
+    ) -> Tuple[Dict[Hashable, List[str]], Dict[str, int]]:
+        cache_key = f"index:{self.name}"
+        built = table.base_cache.get(cache_key)
+        if built is None:
+            with _build_lock:
+                built = table.base_cache.get(cache_key)
+                if built is None:
+                    index: Dict[Hashable, List[str]] = {}
+                    positions: Dict[str, int] = {}
+                    for position, (key, record) in enumerate(table.base.items()):
+                        for value in self.values(record):
+                            index.setdefault(value, []).append(key)
+                        positions[key] = position
+                    built = (index, positions)
+                    table.base_cache[cache_key] = built
+        return built
+
+    def _changed_keys(self, table: OverlayTable) -> List[str]:
+        # touched keys whose indexed value differs from the base, including added and
+        # deleted records
+        changed = []
+        base = table.base
+        for key in table.touched_keys():
+            if key in base and key in table:
+                if self.values(base[key]) == self.values(table.peek(key)):
+                    continue
+            changed.append(key)
+        return changed
+
+    def lookup(self, table: Mapping, value: Hashable) -> List[str]:
+        if not isinstance(table, OverlayTable):
+            return [key for key, record in table.items() if value in self.values(record)]
+        index, positions = self._base_index(table)
+        changed = self._changed_keys(table)
+        if len(changed) == 0:
+            return list(index.get(value, []))
+        changed_set = set(changed)
+        matches = [key for key in index.get(value, []) if key not in changed_set]
+        for key in table.overlay_keys():
+            if key in changed_set and value in self.values(table.peek(key)):
+                matches.append(key)
+        matches.sort(key=lambda key: positions.get(key, len(positions)))
+        return matches
+
+    def first(self, table: Mapping, value: Hashable) -> Optional[str]:
+        matches = self.lookup(table, value)
+        return matches[0] if len(matches) > 0 else None
+
+    def mapping(self, table: Mapping) -> Dict[Hashable, List[str]]:
+        """All indexed values and their keys. The result is shared and must not be
+        mutated."""
+        if not isinstance(table, OverlayTable):
+            index: Dict[Hashable, List[str]] = {}
+            for key, record in table.items():
+                for value in self.values(record):
+                    index.setdefault(value, []).append(key)
+            return index
+        index, _ = self._base_index(table)
+        if len(self._changed_keys(table)) == 0:
+            return index
+        return self.mapping(dict(table.items()))
+
+    def sorted_values(self, table: Mapping) -> List[Hashable]:
+        """The indexed values in sorted order, cached for the untouched base."""
+        if isinstance(table, OverlayTable) and len(self._changed_keys(table)) == 0:
+            cache_key = f"sorted:{self.name}"
+            if cache_key not in table.base_cache:
+                table.base_cache[cache_key] = sorted(self._base_index(table)[0])
+            return table.base_cache[cache_key]
+        return sorted(self.mapping(table))
+
+
+class MultiRecordIndex(RecordIndex):
+    """A `RecordIndex` whose `key_func` returns several values per record, e.g. one per
+    date on which a flight is available. A record is listed under each of its values."""
+
+    def __init__(
+        self, name: str, key_func: Callable[[Any], Iterable[Hashable]]
+    ) -> None:
+        super().__init__(name, key_func)  # type: ignore[arg-type]
+
+    def values(self, record: Any) -> Tuple[Hashable, ...]:
+        return tuple(self.key_func(record))
@@ -0,0 +1,173 @@
+# Copyright Sierra
+
+from collections.abc import ItemsView, Iterator, MutableMapping, ValuesView
+from typing import Any, Dict, List, Optional, Set
+
+
+def copy_record(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: copy_record(item) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [copy_record(item) for item in value]
+    return value
+
+
+class _ReadOnlyValuesView(ValuesView):
+    def __iter__(self) -> Iterator[Any]:
+        for key in self._mapping:
+            yield self._mapping.peek(key)
+
+
+class _ReadOnlyItemsView(ItemsView):
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        for key in self._mapping:
+            yield key, self._mapping.peek(key)
+
+
+class OverlayTable(MutableMapping):
+    """A copy-on-write view of one table (e.g. `orders`) of a shared base database.
+
+    Indexing a record (`table[key]`) copies it from the base into a private overlay the
+    first time, so the caller may mutate it freely. Iterating `values()` / `items()`
+    yields untouched records straight from the base without copying them; those must be
+    treated as read-only.
+
+    `base_hashes` optionally caches the hashes of the base records (see
+    `tau_bench.envs.data_hash`), so that only touched records are re-hashed. `base_cache`
+    is shared by every overlay of the same base table and holds other structures derived
+    from the base, such as secondary indexes (see `tau_bench.envs.index`).
+    `serialized` caches the serialized form of overlay records for this episode only; an
+    entry is dropped whenever its record is handed out for mutation (indexed, assigned or
+    deleted), see `tau_bench.envs.response_cache`.
+    """
+
+    def __init__(
+        self,
+        base: Dict[str, Any],
+        base_hashes: Optional[Any] = None,
+        base_cache: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._base = base
+        self.base_hashes = base_hashes
+        self.base_cache = base_cache if base_cache is not None else {}
+        self._overlay: Dict[str, Any] = {}
+        self._deleted: Set[str] = set()
+        self.serialized: Dict[str, str] = {}
+
+    def peek(self, key: str) -> Any:
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        return self._base[key]
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._overlay:
+            self.serialized.pop(key, None)
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        record = copy_record(self._base[key])
+        self._overlay[key] = record
+        return record
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._overlay[key] = value
+        self._deleted.discard(key)
+        self.serialized.pop(key, None)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        self.serialized.pop(key, None)
+        if key in self._base:
+            self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._overlay or (key in self._base and key not in self._deleted)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._base:
+            if key not in self._deleted:
+                yield key
+        for key in self._overlay:
+            if key not in self._base:
+                yield key
+
+    def __len__(self) -> int:
+        num_added = sum(1 for key in self._overlay if key not in self._base)
+        return len(self._base) - len(self._deleted) + num_added
+
+    def values(self) -> ValuesView:
+        return _ReadOnlyValuesView(self)
+
+    def items(self) -> ItemsView:
+        return _ReadOnlyItemsView(self)
+
+    @property
+    def base(self) -> Dict[str, Any]:
+        return self._base
+
+    def touched_keys(self) -> Set[str]:
+        return set(self._overlay) | self._deleted
+
+    def overlay_keys(self) -> List[str]:
+        return list(self._overlay)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: copy_record(value) for key, value in self.items()}
+
+
+class OverlayDatabase(MutableMapping):
+    """A per-episode database that shares one read-only base across episodes.
+
+    Each top-level table is wrapped in an `OverlayTable`, so creating a fresh database is
+    O(number of tables) and per-episode memory grows only with the records a tool touches.
+    `base_digest` identifies the content of the base (see `DataSnapshot.digest`).
+    """
+
+    def __init__(
+        self,
+        base: Dict[str, Any],
+        base_hashes: Optional[Dict[str, Any]] = None,
+        base_digest: Optional[str] = None,
+        base_caches: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        self._base = base
+        self.base_digest = base_digest
+        base_hashes = base_hashes or {}
+        base_caches = base_caches or {}
+        self._tables: Dict[str, Any] = {
+            name: (
+                OverlayTable(
+                    table,
+                    base_hashes=base_hashes.get(name),
+                    base_cache=base_caches.get(name),
+                )
+                if isinstance(table, dict)
+                else copy_record(table)
+            )
+            for name, table in base.items()
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        return self._tables[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._tables[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._tables[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            name: table.to_dict() if isinstance(table, OverlayTable) else copy_record(table)
+            for name, table in self._tables.items()
+        }
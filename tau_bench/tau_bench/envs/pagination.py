@@ -0,0 +1,95 @@
+# Copyright Sierra
+
+import base64
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 10
+
+
+def page_parameters() -> Dict[str, Any]:
+    """The optional `page_size` and `cursor` parameters of a paginated tool's schema."""
+    return {
+        "page_size": {
+            "type": "integer",
+            "description": "(Optional) The maximum number of results to return. If given, the output is an object with the 'results' and a 'next_cursor', which is null on the last page.",
+        },
+        "cursor": {
+            "type": "string",
+            "description": "(Optional) The 'next_cursor' of the previous page, to get the page after it.",
+        },
+    }
+
+
+def encode_cursor(key: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("invalid cursor")
+
+
+class Page(object):
+    """The position of one page in a result set ordered by a unique sort key.
+
+    The cursor holds the key of the last result of the previous page, so a page starts
+    right after it even if results were added or removed in between (e.g. seats sold
+    out) and no result is repeated or skipped because of it.
+    """
+
+    def __init__(
+        self,
+        page_size: Optional[int],
+        cursor: Optional[str],
+        key_size: Optional[int] = None,
+    ) -> None:
+        """`key_size` is the number of strings in a tuple sort key, or None if the sort
+        key is a single string."""
+        self.page_size = DEFAULT_PAGE_SIZE if page_size is None else page_size
+        if self.page_size <= 0:
+            raise ValueError("page_size must be positive")
+        self.after = None if cursor is None else _as_key(decode_cursor(cursor))
+        if cursor is not None and not _is_key(self.after, key_size):
+            raise ValueError("invalid cursor")
+
+    def includes(self, key: Any) -> bool:
+        return self.after is None or _as_key(key) > self.after
+
+    def take(
+        self, keys: Iterable[Any], result: Callable[[Any], Any]
+    ) -> Tuple[List[Any], Optional[str]]:
+        """The results of the page, built with `result` from the keys of the result set
+        in key order, and the cursor of the next page. Stops reading `keys` once the
+        page is full."""
+        results = []
+        last_key = None
+        for key in keys:
+            if not self.includes(key):
+                continue
+            if len(results) == self.page_size:
+                return results, encode_cursor(last_key)
+            results.append(result(key))
+            last_key = key
+        return results, None
+
+
+def _is_key(key: Any, key_size: Optional[int]) -> bool:
+    if key_size is None:
+        return isinstance(key, str)
+    return (
+        isinstance(key, tuple)
+        and len(key) == key_size
+        and all(isinstance(part, str) for part in key)
+    )
+
+
+def _as_key(key: Any) -> Any:
+    # keys round-trip through JSON, which turns tuples into lists
+    return tuple(key) if isinstance(key, (list, tuple)) else key
+
+
+def is_paginated(page_size: Optional[int], cursor: Optional[str]) -> bool:
+    return page_size is not None or cursor is not None
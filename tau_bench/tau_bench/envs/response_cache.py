@@ -0,0 +1,71 @@
+# Copyright Sierra
+
+import json
+import threading
+from collections.abc import Mapping
+from typing import Dict
+
+from tau_bench.envs.overlay import OverlayTable
+
+
+class ResponseCacheStats(object):
+    """Hit and miss counters of the serialized record cache, for profiling."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+_stats = ResponseCacheStats()
+
+
+def get_response_cache_stats() -> ResponseCacheStats:
+    return _stats
+
+
+def dump_record(table: Mapping, key: str) -> str:
+    """Returns `json.dumps(table[key])` without copying the record into the episode's
+    overlay, reusing an earlier serialization when the record has not been handed out for
+    mutation since.
+
+    Untouched base records are cached on the snapshot and shared by every episode; records
+    in an episode's overlay are cached on its `OverlayTable` until a tool indexes them
+    again. Plain dict tables are serialized on every call.
+    """
+    if not isinstance(table, OverlayTable):
+        _stats.record(False)
+        return json.dumps(table[key])
+    record = table.peek(key)
+    if record is table.base.get(key):
+        cache = table.base_cache.setdefault("json", {})
+    else:
+        cache = table.serialized
+    serialized = cache.get(key)
+    if serialized is not None:
+        _stats.record(True)
+        return serialized
+    _stats.record(False)
+    serialized = json.dumps(record)
+    cache[key] = serialized
+    return serialized
@@ -2,12 +2,14 @@
 
 import json
 import os
-from typing import Any
+from typing import Any, MutableMapping
+
+from tau_bench.envs.snapshot import get_snapshot
 
 FOLDER_PATH = os.path.dirname(__file__)
 
 
-def load_data() -> dict[str, Any]:
+def read_data() -> dict[str, Any]:
     with open(os.path.join(FOLDER_PATH, "orders.json")) as f:
         order_data = json.load(f)
     with open(os.path.join(FOLDER_PATH, "products.json")) as f:
@@ -19,3 +21,7 @@ def load_data() -> dict[str, Any]:
         "products": product_data,
         "users": user_data,
     }
+
+
+def load_data() -> MutableMapping[str, Any]:
+    return get_snapshot("retail", read_data).overlay()
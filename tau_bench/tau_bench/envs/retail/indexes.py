@@ -0,0 +1,16 @@
+# Copyright Sierra
+
+from tau_bench.envs.index import RecordIndex
+
+USERS_BY_EMAIL = RecordIndex("users_by_email", lambda user: user["email"].lower())
+
+USERS_BY_NAME_ZIP = RecordIndex(
+    "users_by_name_zip",
+    lambda user: (
+        user["name"]["first_name"].lower(),
+        user["name"]["last_name"].lower(),
+        user["address"]["zip"],
+    ),
+)
+
+PRODUCTS_BY_NAME = RecordIndex("products_by_name", lambda product: product["name"])
@@ -1,16 +1,16 @@
 # Copyright Sierra
 
 from typing import Any, Dict
+from tau_bench.envs.retail.indexes import USERS_BY_EMAIL
 from tau_bench.envs.tool import Tool
 
 
 class FindUserIdByEmail(Tool):
     @staticmethod
     def invoke(data: Dict[str, Any], email: str) -> str:
-        users = data["users"]
-        for user_id, profile in users.items():
-            if profile["email"].lower() == email.lower():
-                return user_id
+        user_id = USERS_BY_EMAIL.first(data["users"], email.lower())
+        if user_id is not None:
+            return user_id
         return "Error: user not found"
 
     @staticmethod
@@ -1,19 +1,47 @@
 # Copyright Sierra
 
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from tau_bench.envs.index import peek
+from tau_bench.envs.pagination import Page, is_paginated, page_parameters
+from tau_bench.envs.retail.indexes import PRODUCTS_BY_NAME
 from tau_bench.envs.tool import Tool
 
 
 class ListAllProductTypes(Tool):
     @staticmethod
-    def invoke(data: Dict[str, Any]) -> str:
+    def invoke(
+        data: Dict[str, Any],
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> str:
         products = data["products"]
-        product_dict = {
-            product["name"]: product["product_id"] for product in products.values()
-        }
-        product_dict = dict(sorted(product_dict.items()))
-        return json.dumps(product_dict)
+        names = PRODUCTS_BY_NAME.mapping(products)
+
+        def product_id(name: str) -> str:
+            # the last product with a given name wins, as when building a dict by
+            # iteration
+            return peek(products, names[name][-1])["product_id"]
+
+        if not is_paginated(page_size, cursor):
+            product_dict = {
+                name: product_id(name)
+                for name in PRODUCTS_BY_NAME.sorted_values(products)
+            }
+            return json.dumps(product_dict)
+        try:
+            page = Page(page_size, cursor)
+        except ValueError as e:
+            return f"Error: {e}"
+        page_names, next_cursor = page.take(
+            PRODUCTS_BY_NAME.sorted_values(products), lambda name: name
+        )
+        return json.dumps(
+            {
+                "results": {name: product_id(name) for name in page_names},
+                "next_cursor": next_cursor,
+            }
+        )
 
     @staticmethod
     def get_info() -> Dict[str, Any]:
@@ -24,7 +52,9 @@ class ListAllProductTypes(Tool):
                 "description": "List the name and product id of all product types. Each product type has a variety of different items with unique item ids and options. There are only 50 product types in the store.",
                 "parameters": {
                     "type": "object",
-                    "properties": {},
+                    "properties": {
+                        **page_parameters(),
+                    },
                     "required": [],
                 },
             },
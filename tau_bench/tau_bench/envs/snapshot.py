@@ -0,0 +1,67 @@
+# Copyright Sierra
+
+import pickle
+import threading
+from hashlib import sha256
+from typing import Any, Callable, Dict
+
+from tau_bench.envs.data_hash import RecordHashCache
+from tau_bench.envs.overlay import OverlayDatabase
+
+
+class DataSnapshot(object):
+    """An immutable, parsed copy of a domain database.
+
+    The JSON files are read once. `overlay()` returns a copy-on-write database that shares
+    the parsed records with every other episode and only copies the records an episode
+    writes; it is what `load_data()` hands out per episode. `clone()` decodes a fully
+    private copy from a pickled blob. It is only about 1.1x-1.8x faster than re-parsing
+    the JSON from disk, so it is superseded by `overlay()` and kept for callers that need
+    plain dicts (e.g. the benchmark baseline). `data` itself must never be mutated.
+    """
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        self.record_hashes = {
+            name: RecordHashCache(table)
+            for name, table in data.items()
+            if isinstance(table, dict)
+        }
+        self.table_caches: Dict[str, Dict[str, Any]] = {
+            name: {} for name, table in data.items() if isinstance(table, dict)
+        }
+        self._blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        self.digest = sha256(self._blob).hexdigest()
+
+    def overlay(self) -> OverlayDatabase:
+        return OverlayDatabase(
+            self.data,
+            base_hashes=self.record_hashes,
+            base_digest=self.digest,
+            base_caches=self.table_caches,
+        )
+
+    def clone(self) -> Dict[str, Any]:
+        """A private deep copy of the data. Not on the per-episode path; use `overlay()`."""
+        return pickle.loads(self._blob)
+
+
+_SNAPSHOTS: Dict[str, DataSnapshot] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def get_snapshot(
+    name: str, read_func: Callable[[], Dict[str, Any]]
+) -> DataSnapshot:
+    snapshot = _SNAPSHOTS.get(name)
+    if snapshot is not None:
+        return snapshot
+    with _SNAPSHOTS_LOCK:
+        if name not in _SNAPSHOTS:
+            _SNAPSHOTS[name] = DataSnapshot(read_func())
+        return _SNAPSHOTS[name]
+
+
+def clear_snapshots() -> None:
+    with _SNAPSHOTS_LOCK:
+        _SNAPSHOTS.clear()
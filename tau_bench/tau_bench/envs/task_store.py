@@ -0,0 +1,137 @@
+# Copyright Sierra
+
+import importlib
+import importlib.util
+import json
+import mmap
+import os
+import threading
+from array import array
+from collections.abc import Sequence
+from hashlib import sha256
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from tau_bench.envs.gt_cache import get_cache_dir
+from tau_bench.types import Task
+
+STORE_FORMAT = 1
+
+# (env name, task split) -> (module, attribute) of the python source of the task set
+TASK_MODULES: Dict[Tuple[str, str], Tuple[str, str]] = {
+    ("retail", "test"): ("tau_bench.envs.retail.tasks_test", "TASKS_TEST"),
+    ("retail", "train"): ("tau_bench.envs.retail.tasks_train", "TASKS_TRAIN"),
+    ("retail", "dev"): ("tau_bench.envs.retail.tasks_dev", "TASKS_DEV"),
+    ("airline", "test"): ("tau_bench.envs.airline.tasks_test", "TASKS"),
+}
+
+
+class TaskStore(Sequence):
+    """A read-only list of tasks backed by a compiled JSONL file.
+
+    The first line of the file is a header with the number of tasks, so `len()` does not
+    read the rest of the file. Each following line is one task, decoded into a `Task`
+    only when it is indexed. The file is memory-mapped and the line offsets are built on
+    first access, so neither startup time nor resident memory scale with the split size.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self.header = json.loads(f.readline())
+        if self.header.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported task store format in {path}")
+        self._count: int = self.header["count"]
+        self._mmap: Optional[mmap.mmap] = None
+        self._offsets: Optional[array] = None
+        self._lock = threading.Lock()
+
+    def _load_offsets(self) -> Tuple[mmap.mmap, array]:
+        with self._lock:
+            if self._mmap is None or self._offsets is None:
+                with open(self.path, "rb") as f:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                offsets = array("q")
+                pos = buf.find(b"\n") + 1
+                while pos < len(buf):
+                    offsets.append(pos)
+                    pos = buf.find(b"\n", pos) + 1
+                    if pos == 0:
+                        break
+                offsets.append(len(buf))
+                if len(offsets) - 1 != self._count:
+                    raise ValueError(f"Corrupt task store {self.path}")
+                self._offsets = offsets
+                self._mmap = buf
+        return self._mmap, self._offsets
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Task, List[Task]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("task index out of range")
+        buf, offsets = self._load_offsets()
+        return Task.model_validate_json(buf[offsets[index] : offsets[index + 1]])
+
+    def __iter__(self) -> Iterator[Task]:
+        for i in range(self._count):
+            yield self[i]
+
+
+def write_task_store(tasks: List[Task], path: str, source_digest: str = "") -> None:
+    header = {"format": STORE_FORMAT, "count": len(tasks), "source_digest": source_digest}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(json.dumps(header) + "\n")
+        for task in tasks:
+            f.write(task.model_dump_json() + "\n")
+    os.replace(tmp_path, path)
+
+
+def _source_digest(module_name: str) -> str:
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None:
+        raise ValueError(f"Cannot find task module {module_name}")
+    with open(spec.origin, "rb") as f:
+        return sha256(f.read()).hexdigest()
+
+
+_stores: Dict[Tuple[str, str], Sequence] = {}
+_stores_lock = threading.Lock()
+
+
+def load_tasks(env_name: str, task_split: str) -> Sequence:
+    """Returns the tasks of a split as a lazily decoded `TaskStore`.
+
+    The store is compiled from the python task module the first time it is needed (or
+    after the module changes) and kept in the cache directory. If the cache directory is
+    not writable, the python task list itself is returned.
+    """
+    key = (env_name, task_split)
+    if key not in TASK_MODULES:
+        raise ValueError(f"Unknown task split: {task_split}")
+    with _stores_lock:
+        if key in _stores:
+            return _stores[key]
+        module_name, attr = TASK_MODULES[key]
+        digest = _source_digest(module_name)
+        path = os.path.join(
+            get_cache_dir(), "tasks", f"{env_name}-{task_split}-{digest[:16]}.jsonl"
+        )
+        store: Sequence
+        try:
+            store = TaskStore(path)
+        except (OSError, ValueError):
+            tasks = getattr(importlib.import_module(module_name), attr)
+            try:
+                write_task_store(tasks, path, source_digest=digest)
+                store = TaskStore(path)
+            except OSError:
+                store = tasks
+        _stores[key] = store
+        return store
@@ -1,8 +1,9 @@
 # Copyright Sierra
 
 import abc
+import asyncio
 import enum
-from litellm import completion
+from tau_bench.llm import acompletion, completion
 
 from typing import Optional, List, Dict, Any, Union
 
@@ -22,6 +23,12 @@ class BaseUserSimulationEnv(abc.ABC):
     def get_total_cost(self) -> float:
         raise NotImplementedError
 
+    async def areset(self, instruction: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.reset, instruction)
+
+    async def astep(self, content: str) -> str:
+        return await asyncio.to_thread(self.step, content)
+
 
 class HumanUserSimulationEnv(BaseUserSimulationEnv):
     def reset(self, instruction: str) -> str:
@@ -41,7 +48,6 @@ class LLMUserSimulationEnv(BaseUserSimulationEnv):
         self.model = model
         self.provider = provider
         self.total_cost = 0.0
-        self.reset()
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
         res = completion(
@@ -52,6 +58,15 @@ class LLMUserSimulationEnv(BaseUserSimulationEnv):
         self.total_cost = res._hidden_params["response_cost"]
         return message.content
 
+    async def agenerate_next_message(self, messages: List[Dict[str, Any]]) -> str:
+        res = await acompletion(
+            model=self.model, custom_llm_provider=self.provider, messages=messages
+        )
+        message = res.choices[0].message
+        self.messages.append(message.model_dump())
+        self.total_cost = res._hidden_params["response_cost"]
+        return message.content
+
     def build_system_prompt(self, instruction: Optional[str]) -> str:
         instruction_display = (
             ("\n\nInstruction: " + instruction + "\n")
@@ -81,6 +96,20 @@ Rules:
         self.messages.append({"role": "user", "content": content})
         return self.generate_next_message(self.messages)
 
+    async def areset(self, instruction: Optional[str] = None) -> str:
+        self.messages = [
+            {
+                "role": "system",
+                "content": self.build_system_prompt(instruction=instruction),
+            },
+            {"role": "user", "content": "Hi! How can I help you today?"},
+        ]
+        return await self.agenerate_next_message(self.messages)
+
+    async def astep(self, content: str) -> str:
+        self.messages.append({"role": "user", "content": content})
+        return await self.agenerate_next_message(self.messages)
+
     def get_total_cost(self) -> float:
         return self.total_cost
 
@@ -88,7 +117,6 @@ Rules:
 class ReactUserSimulationEnv(LLMUserSimulationEnv):
     def __init__(self, model: str, provider: str) -> None:
         super().__init__(model=model, provider=provider)
-        self.reset()
 
     def build_system_prompt(self, instruction: Optional[str]) -> str:
         instruction_display = (
@@ -123,6 +151,15 @@ User Response:
         self.total_cost = res._hidden_params["response_cost"]
         return self.parse_response(message.content)
 
+    async def agenerate_next_message(self, messages: List[Dict[str, Any]]) -> str:
+        res = await acompletion(
+            model=self.model, custom_llm_provider=self.provider, messages=messages
+        )
+        message = res.choices[0].message
+        self.messages.append(message.model_dump())
+        self.total_cost = res._hidden_params["response_cost"]
+        return self.parse_response(message.content)
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
@@ -155,10 +192,11 @@ User Response:
 
 class VerifyUserSimulationEnv(LLMUserSimulationEnv):
     def __init__(self, model: str, provider: str, max_attempts: int = 3) -> None:
+        self.messages: List[Dict[str, Any]] = []
         self.model = model
         self.provider = provider
         self.max_attempts = max_attempts
-        self.reset()
+        self.total_cost = 0.0
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
         attempts = 0
@@ -176,6 +214,22 @@ class VerifyUserSimulationEnv(LLMUserSimulationEnv):
         assert cur_message is not None
         return cur_message.content
 
+    async def agenerate_next_message(self, messages: List[Dict[str, Any]]) -> str:
+        attempts = 0
+        cur_message = None
+        while attempts < self.max_attempts:
+            res = await acompletion(
+                model=self.model, custom_llm_provider=self.provider, messages=messages
+            )
+            cur_message = res.choices[0].message
+            self.total_cost = res._hidden_params["response_cost"]
+            if await averify(self.model, self.provider, cur_message, messages):
+                self.messages.append(cur_message.model_dump())
+                return cur_message.content
+            attempts += 1
+        assert cur_message is not None
+        return cur_message.content
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
@@ -203,9 +257,7 @@ def map_role_label(role: str) -> str:
         return role.capitalize()
 
 
-def verify(
-    model: str, provider: str, response: str, messages: List[Dict[str, Any]]
-) -> bool:
+def build_verify_prompt(response: str, messages: List[Dict[str, Any]]) -> str:
     transcript = "\n".join(
         [
             f"{map_role_label(message['role'])}: {message['content']}"
@@ -224,17 +276,32 @@ Your answer will be parsed, so do not include any other text than the classifica
 -----
 
 Classification:"""
+    return prompt
+
+
+def verify(
+    model: str, provider: str, response: str, messages: List[Dict[str, Any]]
+) -> bool:
     res = completion(
         model=model,
         custom_llm_provider=provider,
-        messages=[{"role": "user", "content": prompt}],
+        messages=[{"role": "user", "content": build_verify_prompt(response, messages)}],
     )
     return "true" in res.choices[0].message.content.lower()
 
 
-def reflect(
+async def averify(
     model: str, provider: str, response: str, messages: List[Dict[str, Any]]
-) -> str:
+) -> bool:
+    res = await acompletion(
+        model=model,
+        custom_llm_provider=provider,
+        messages=[{"role": "user", "content": build_verify_prompt(response, messages)}],
+    )
+    return "true" in res.choices[0].message.content.lower()
+
+
+def build_reflect_prompt(response: str, messages: List[Dict[str, Any]]) -> str:
     transcript = "\n".join(
         [
             f"{map_role_label(message['role'])}: {message['content']}"
@@ -258,10 +325,28 @@ Reflection:
 
 Response:
 <the response (this will be parsed and sent to the agent)>"""
+    return prompt
+
+
+def reflect(
+    model: str, provider: str, response: str, messages: List[Dict[str, Any]]
+) -> str:
     res = completion(
         model=model,
         custom_llm_provider=provider,
-        messages=[{"role": "user", "content": prompt}],
+        messages=[{"role": "user", "content": build_reflect_prompt(response, messages)}],
+    )
+    _, response = res.choices[0].message.content.split("Response:")
+    return response.strip()
+
+
+async def areflect(
+    model: str, provider: str, response: str, messages: List[Dict[str, Any]]
+) -> str:
+    res = await acompletion(
+        model=model,
+        custom_llm_provider=provider,
+        messages=[{"role": "user", "content": build_reflect_prompt(response, messages)}],
     )
     _, response = res.choices[0].message.content.split("Response:")
     return response.strip()
@@ -269,10 +354,11 @@ Response:
 
 class ReflectionUserSimulationEnv(LLMUserSimulationEnv):
     def __init__(self, model: str, provider: str, max_attempts: int = 2) -> None:
+        self.messages: List[Dict[str, Any]] = []
         self.model = model
         self.provider = provider
         self.max_attempts = max_attempts
-        self.reset()
+        self.total_cost = 0.0
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
         cur_messages = messages.copy()
@@ -291,6 +377,23 @@ class ReflectionUserSimulationEnv(LLMUserSimulationEnv):
             attempts += 1
         return initial_response
 
+    async def agenerate_next_message(self, messages: List[Dict[str, Any]]) -> str:
+        cur_messages = messages.copy()
+        initial_response = await super().agenerate_next_message(cur_messages)
+        if await averify(self.model, self.provider, initial_response, cur_messages):
+            return initial_response
+        attempts = 1
+        while attempts < self.max_attempts:
+            new_message = await areflect(
+                self.model, self.provider, initial_response, cur_messages
+            )
+            cur_messages.append({"role": "user", "content": new_message})
+            new_response = await super().agenerate_next_message(cur_messages)
+            if await averify(self.model, self.provider, new_response, cur_messages):
+                return new_response
+            attempts += 1
+        return initial_response
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
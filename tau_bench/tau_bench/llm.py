@@ -0,0 +1,211 @@
+# Copyright Sierra
+
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+
+import litellm
+
+from tau_bench.cassette import Cassette
+from tau_bench.concurrency import ConcurrencyControllers, ConcurrencyStats
+from tau_bench.prompt_cache import add_cache_breakpoints, supports_cache_control
+from tau_bench.token_budget import (
+    TokenBudgets,
+    TokenBudgetStats,
+    estimate_request_tokens,
+)
+from tau_bench.usage import record_usage
+
+# errors that signal the provider is over capacity, as opposed to a bad request
+CONGESTION_ERRORS = (
+    litellm.RateLimitError,
+    litellm.Timeout,
+    litellm.ServiceUnavailableError,
+)
+
+_controllers: Optional[ConcurrencyControllers] = None
+_max_retries = 0
+_token_budgets = TokenBudgets()
+_cassette: Optional[Cassette] = None
+_prompt_caching = False
+
+
+def enable_adaptive_concurrency(max_retries: int = 5, **controller_kwargs: Any) -> None:
+    """Routes every completion through a per-(provider, model) AIMD concurrency
+    controller (see `tau_bench.concurrency.AIMDController`). Requests that hit a rate
+    limit or time out are retried up to `max_retries` times with jittered exponential
+    backoff."""
+    global _controllers, _max_retries
+    _controllers = ConcurrencyControllers(**controller_kwargs)
+    _max_retries = max_retries
+
+
+def disable_adaptive_concurrency() -> None:
+    global _controllers, _max_retries
+    _controllers = None
+    _max_retries = 0
+
+
+def get_concurrency_stats() -> Dict[str, ConcurrencyStats]:
+    return {} if _controllers is None else _controllers.stats()
+
+
+def set_token_budget(
+    provider: Optional[str], model: str, tokens_per_minute: int
+) -> None:
+    """Admits the requests to `model` through a token bucket that refills at
+    `tokens_per_minute` (see `tau_bench.token_budget.TokenBucket`)."""
+    _token_budgets.set(provider, model, tokens_per_minute)
+
+
+def clear_token_budgets() -> None:
+    _token_budgets.clear()
+
+
+def get_token_budget_stats() -> Dict[str, TokenBudgetStats]:
+    return _token_budgets.stats()
+
+
+def use_cassette(path: Optional[str], mode: str = "replay") -> Optional[Cassette]:
+    """Records every completion to the cassette at `path`, or replays them from it (see
+    `tau_bench.cassette.Cassette`). `None` stops using a cassette."""
+    global _cassette
+    _cassette = Cassette(path, mode) if path is not None else None
+    return _cassette
+
+
+def enable_prompt_caching(enabled: bool = True) -> None:
+    """Adds `cache_control` breakpoints to the requests to models that take them (see
+    `tau_bench.prompt_cache.add_cache_breakpoints`). Providers that cache prompt
+    prefixes automatically (e.g. OpenAI) need no breakpoints, only a stable prefix."""
+    global _prompt_caching
+    _prompt_caching = enabled
+
+
+def prompt_caching_enabled() -> bool:
+    return _prompt_caching
+
+
+def _with_prompt_caching(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    if not _prompt_caching or not supports_cache_control(
+        kwargs.get("custom_llm_provider"), kwargs["model"]
+    ):
+        return kwargs
+    return {**kwargs, "messages": add_cache_breakpoints(kwargs["messages"])}
+
+
+def _usage_tokens(res: Any) -> Optional[int]:
+    usage = getattr(res, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+
+def _backoff(attempt: int) -> float:
+    return min(60.0, 2.0**attempt) * (0.5 + random.random() / 2)
+
+
+def completion(**kwargs: Any) -> Any:
+    """`litellm.completion`, admitted through the token budget of the model if it has one
+    and its concurrency controller if adaptive concurrency is enabled. With a cassette in
+    use, the response is recorded to it, or replayed from it without calling the model.
+    The usage of the response is added to the active `tau_bench.usage.track_usage`."""
+    if _cassette is not None and _cassette.mode == "replay":
+        res = _cassette.replay(kwargs)
+    else:
+        res = _budgeted_completion(**_with_prompt_caching(kwargs))
+        if _cassette is not None:
+            _cassette.record(kwargs, res)
+    record_usage(kwargs["model"], res)
+    return res
+
+
+async def acompletion(**kwargs: Any) -> Any:
+    """The coroutine counterpart of `completion`."""
+    if _cassette is not None and _cassette.mode == "replay":
+        res = _cassette.replay(kwargs)
+    else:
+        res = await _abudgeted_completion(**_with_prompt_caching(kwargs))
+        if _cassette is not None:
+            _cassette.record(kwargs, res)
+    record_usage(kwargs["model"], res)
+    return res
+
+
+def _budgeted_completion(**kwargs: Any) -> Any:
+    bucket = _token_budgets.get(kwargs.get("custom_llm_provider"), kwargs["model"])
+    if bucket is None:
+        return _completion(**kwargs)
+    estimated = estimate_request_tokens(kwargs)
+    bucket.acquire(estimated)
+    res = _completion(**kwargs)
+    actual = _usage_tokens(res)
+    if actual is not None:
+        bucket.reconcile(estimated, actual)
+    return res
+
+
+async def _abudgeted_completion(**kwargs: Any) -> Any:
+    bucket = _token_budgets.get(kwargs.get("custom_llm_provider"), kwargs["model"])
+    if bucket is None:
+        return await _acompletion(**kwargs)
+    estimated = estimate_request_tokens(kwargs)
+    await bucket.aacquire(estimated)
+    res = await _acompletion(**kwargs)
+    actual = _usage_tokens(res)
+    if actual is not None:
+        bucket.reconcile(estimated, actual)
+    return res
+
+
+def _completion(**kwargs: Any) -> Any:
+    if _controllers is None:
+        return litellm.completion(**kwargs)
+    controller = _controllers.get(kwargs.get("custom_llm_provider"), kwargs["model"])
+    # the provider SDKs retry rate limits on their own by default, which would hide them
+    # from the controller
+    kwargs = {"max_retries": 0, **kwargs}
+    attempt = 0
+    while True:
+        controller.acquire()
+        start_time = time.perf_counter()
+        try:
+            res = litellm.completion(**kwargs)
+        except CONGESTION_ERRORS:
+            controller.release(congested=True)
+            if attempt >= _max_retries:
+                raise
+            time.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+        except BaseException:
+            controller.release()
+            raise
+        controller.release(latency=time.perf_counter() - start_time)
+        return res
+
+
+async def _acompletion(**kwargs: Any) -> Any:
+    if _controllers is None:
+        return await litellm.acompletion(**kwargs)
+    controller = _controllers.get(kwargs.get("custom_llm_provider"), kwargs["model"])
+    # the provider SDKs retry rate limits on their own by default, which would hide them
+    # from the controller
+    kwargs = {"max_retries": 0, **kwargs}
+    attempt = 0
+    while True:
+        await controller.aacquire()
+        start_time = time.perf_counter()
+        try:
+            res = await litellm.acompletion(**kwargs)
+        except CONGESTION_ERRORS:
+            controller.release(congested=True)
+            if attempt >= _max_retries:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+        except BaseException:
+            controller.release()
+            raise
+        controller.release(latency=time.perf_counter() - start_time)
+        return res
@@ -0,0 +1,84 @@
+# Copyright Sierra
+
+from math import comb
+from typing import List
+
+from tau_bench.types import EnvRunResult
+
+
+def display_metrics(
+    results: List[EnvRunResult], prompt_caching: bool = False
+) -> None:
+    """Prints the reward, pass^k and efficiency metrics of a run. The prompt cache hit
+    rate is only printed if `prompt_caching` was enabled or any cached tokens were
+    reported."""
+    def is_successful(reward: float) -> bool:
+        return (1 - 1e-6) <= reward <= (1 + 1e-6)
+
+    if len(results) == 0:
+        # e.g. a shard of a run with fewer episodes than shards
+        print("🏆 No episodes to report")
+        return
+    num_trials = len(set([r.trial for r in results]))
+    rewards = [r.reward for r in results]
+    avg_reward = sum(rewards) / len(rewards)
+    # c from https://arxiv.org/pdf/2406.12045
+    c_per_task_id: dict[int, int] = {}
+    for result in results:
+        if result.task_id not in c_per_task_id:
+            c_per_task_id[result.task_id] = 1 if is_successful(result.reward) else 0
+        else:
+            c_per_task_id[result.task_id] += 1 if is_successful(result.reward) else 0
+    pass_hat_ks: dict[int, float] = {}
+    for k in range(1, num_trials + 1):
+        sum_task_pass_hat_k = 0
+        for c in c_per_task_id.values():
+            sum_task_pass_hat_k += comb(c, k) / comb(num_trials, k)
+        pass_hat_ks[k] = sum_task_pass_hat_k / len(c_per_task_id)
+    print(f"🏆 Average reward: {avg_reward}")
+    print("📈 Pass^k")
+    for k, pass_hat_k in pass_hat_ks.items():
+        print(f"  k={k}: {pass_hat_k}")
+    latencies = [r.info["latency"] for r in results if "latency" in r.info]
+    if len(latencies) > 0:
+        print(f"⏱️ Average latency per episode: {sum(latencies) / len(latencies):.2f}s")
+    turns_saved = [r.info["turns_saved"] for r in results if "turns_saved" in r.info]
+    if len(turns_saved) > 0:
+        print(
+            f"🔁 Turns saved by parallel tool calls: {sum(turns_saved)} "
+            f"({sum(turns_saved) / len(turns_saved):.2f} per episode)"
+        )
+    sent = [
+        sum(r.info["prompt_tokens_curve"])
+        for r in results
+        if "prompt_tokens_curve" in r.info
+    ]
+    full = [
+        sum(r.info["full_prompt_tokens_curve"])
+        for r in results
+        if "full_prompt_tokens_curve" in r.info
+    ]
+    # results of runs without compaction (or of older runs, which recorded the curves
+    # either way) send the full history on every turn
+    compacted = any(
+        r.info["prompt_tokens_curve"] != r.info["full_prompt_tokens_curve"]
+        for r in results
+        if "prompt_tokens_curve" in r.info
+    )
+    if compacted and sum(full) > 0:
+        print(
+            f"✂️ Estimated agent prompt tokens per episode: {sum(sent) / len(sent):.0f} "
+            f"(without history compaction: {sum(full) / len(full):.0f}, "
+            f"{1 - sum(sent) / sum(full):.1%} saved)"
+        )
+    prompt_tokens = 0
+    cached_prompt_tokens = 0
+    for r in results:
+        for usage in r.info.get("usage", {}).values():
+            prompt_tokens += usage["prompt_tokens"]
+            cached_prompt_tokens += usage["cached_prompt_tokens"]
+    if prompt_tokens > 0 and (prompt_caching or cached_prompt_tokens > 0):
+        print(
+            f"💾 Prompt tokens read from cache: {cached_prompt_tokens} of {prompt_tokens} "
+            f"({cached_prompt_tokens / prompt_tokens:.1%})"
+        )
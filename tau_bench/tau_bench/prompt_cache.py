@@ -0,0 +1,43 @@
+# Copyright Sierra
+
+from typing import Any, Dict, List, Optional
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# providers that serve Claude models and take explicit `cache_control` breakpoints
+CACHE_CONTROL_PROVIDERS = ["anthropic", "bedrock", "vertex_ai"]
+
+
+def supports_cache_control(provider: Optional[str], model: str) -> bool:
+    if provider == "anthropic":
+        return True
+    return provider in CACHE_CONTROL_PROVIDERS and "claude" in model
+
+
+def _with_cache_control(message: Dict[str, Any]) -> Dict[str, Any]:
+    content = message.get("content")
+    if isinstance(content, str) and content != "":
+        blocks = [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    elif isinstance(content, list) and len(content) > 0:
+        blocks = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+    else:
+        return message
+    return {**message, "content": blocks}
+
+
+def add_cache_breakpoints(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """A copy of `messages` with `cache_control` breakpoints at the end of the first
+    system message and at the end of the conversation.
+
+    The first breakpoint caches the tools and the system prompt (e.g. the wiki), which
+    every episode shares; the second caches the conversation so far, which the next turn
+    of the episode extends. The messages themselves are not modified.
+    """
+    messages = list(messages)
+    for i, message in enumerate(messages):
+        if message["role"] == "system":
+            messages[i] = _with_cache_control(message)
+            break
+    if len(messages) > 0 and messages[-1]["role"] != "system":
+        messages[-1] = _with_cache_control(messages[-1])
+    return messages
@@ -1,13 +1,13 @@
 # Copyright Sierra
 
+import asyncio
 import json
-import multiprocessing
 import os
 import random
+import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from math import comb
 from typing import Any, Dict, List
 
 import litellm
@@ -16,9 +16,29 @@ from dotenv import load_dotenv
 from litellm import provider_list
 
 from tau_bench.agents.base import Agent
-from tau_bench.envs import get_env
+from tau_bench.agents.compaction import history_compactor
+from tau_bench.checkpoint import (
+    CheckpointWriter,
+    consolidate_checkpoint,
+    jsonl_checkpoint_path,
+    read_checkpoint,
+    resume_checkpoint_paths,
+    write_checkpoint_log,
+)
+from tau_bench.envs import EnvFactory
 from tau_bench.envs.user import UserStrategy
-from tau_bench.types import EnvRunResult, RunConfig
+from tau_bench.llm import (
+    enable_adaptive_concurrency,
+    get_concurrency_stats,
+    get_token_budget_stats,
+    set_token_budget,
+    enable_prompt_caching,
+    use_cassette,
+)
+from tau_bench.metrics import display_metrics
+from tau_bench.scheduling import WorkItem, expected_costs, schedule, shard
+from tau_bench.types import EnvRunResult, RunConfig, SolveResult
+from tau_bench.usage import UsageTracker, track_usage
 
 load_dotenv()
 
@@ -40,15 +60,54 @@ def run(config: RunConfig) -> List[EnvRunResult]:
     assert config.user_strategy in [item.value for item in UserStrategy], (
         "Invalid user strategy"
     )
+    assert 0 <= config.shard_index < config.num_shards, (
+        "Shard index must be in [0, num_shards)"
+    )
 
     random.seed(config.seed)
     time_str = datetime.now().strftime("%m%d%H%M%S")
     ckpt_path = f"{config.log_dir}/{config.agent_strategy}-{config.model.split('/')[-1]}-{config.temperature}_range_{config.start_index}-{config.end_index}_user-{config.user_model}-{config.user_strategy}_{time_str}.json"
+    if config.num_shards > 1:
+        root, ext = os.path.splitext(ckpt_path)
+        ckpt_path = f"{root}_shard-{config.shard_index}-of-{config.num_shards}{ext}"
+    checkpoint_compression = config.checkpoint_compression
+    previous_results: List[EnvRunResult] = []
+    if config.resume_path is not None:
+        # keep every finished episode of the interrupted run (episodes that raised are
+        # run again) and keep writing to the same checkpoint
+        previous_results = [
+            EnvRunResult.model_validate(r)
+            for r in read_checkpoint(config.resume_path)
+            if "error" not in r["info"]
+        ]
+        ckpt_path, checkpoint_compression = resume_checkpoint_paths(
+            config.resume_path, checkpoint_compression
+        )
+        print(
+            f"Resuming from {config.resume_path}: {len(previous_results)} episodes already done"
+        )
     if not os.path.exists(config.log_dir):
         os.makedirs(config.log_dir)
+    if config.adaptive_concurrency:
+        # --max-concurrency bounds the episodes in flight; the requests each of them
+        # makes are admitted per model by an AIMD controller that finds the capacity
+        # the provider actually has
+        enable_adaptive_concurrency(max_limit=config.max_concurrency)
+    if config.prompt_caching:
+        enable_prompt_caching()
+    if config.cassette_path is not None:
+        use_cassette(config.cassette_path, config.cassette_mode)
+        print(f"Using cassette {config.cassette_path} ({config.cassette_mode})")
+    if config.user_tokens_per_minute is not None:
+        set_token_budget(
+            config.user_model_provider, config.user_model, config.user_tokens_per_minute
+        )
+    if config.tokens_per_minute is not None:
+        # the agent's budget wins if the agent and the user simulator share a model
+        set_token_budget(config.model_provider, config.model, config.tokens_per_minute)
 
     print(f"Loading user with strategy: {config.user_strategy}")
-    env = get_env(
+    env_factory = EnvFactory(
         config.env,
         user_strategy=config.user_strategy,
         user_model=config.user_model,
@@ -56,23 +115,34 @@ def run(config: RunConfig) -> List[EnvRunResult]:
         task_split=config.task_split,
     )
     agent = agent_factory(
-        tools_info=env.tools_info,
-        wiki=env.wiki,
+        tools_info=env_factory.tools_info,
+        wiki=env_factory.wiki,
         config=config,
     )
     end_index = (
-        len(env.tasks)
+        len(env_factory.tasks)
         if config.end_index == -1
-        else min(config.end_index, len(env.tasks))
+        else min(config.end_index, len(env_factory.tasks))
     )
-    results: List[EnvRunResult] = []
-    lock = multiprocessing.Lock()
+    results: List[EnvRunResult] = list(previous_results)
+    completed = {(r.task_id, r.trial) for r in previous_results}
+    # results are appended to a JSONL log while the run is in progress, and consolidated
+    # into `ckpt_path` at the end
+    log_path = jsonl_checkpoint_path(ckpt_path, checkpoint_compression)
+    if config.resume_path is not None:
+        write_checkpoint_log(
+            [r.model_dump() for r in previous_results], log_path, checkpoint_compression
+        )
+    checkpoint_writer = CheckpointWriter(log_path, compression=checkpoint_compression)
     if config.task_ids and len(config.task_ids) > 0:
-        print(f"Running tasks {config.task_ids} (checkpoint path: {ckpt_path})")
+        print(f"Running tasks {config.task_ids} (checkpoint path: {log_path})")
     else:
         print(
-            f"Running tasks {config.start_index} to {end_index} (checkpoint path: {ckpt_path})"
+            f"Running tasks {config.start_index} to {end_index} (checkpoint path: {log_path})"
         )
+    # every (trial, task) episode goes into one work queue, so workers move on to the
+    # next trial while the stragglers of the previous one are still running
+    items: List[WorkItem] = []
     for i in range(config.num_trials):
         if config.task_ids and len(config.task_ids) > 0:
             idxs = config.task_ids
@@ -80,67 +150,122 @@ def run(config: RunConfig) -> List[EnvRunResult]:
             idxs = list(range(config.start_index, end_index))
         if config.shuffle:
             random.shuffle(idxs)
+        items.extend((i, idx) for idx in idxs)
+    if config.num_shards > 1:
+        # the partition is taken over every episode of the run, before skipping the ones
+        # that are already done, so that resuming a shard keeps the same assignment
+        shard_items = set(shard(items, config.shard_index, config.num_shards))
+        items = [item for item in items if item in shard_items]
+    items = [(i, idx) for i, idx in items if (idx, i) not in completed]
+    history = [r.model_dump() for r in previous_results]
+    for path in config.schedule_history_paths or []:
+        history.extend(read_checkpoint(path))
+    items = schedule(items, config.schedule, expected_costs(history))
+
+    def _to_result(trial: int, idx: int, res: SolveResult) -> EnvRunResult:
+        return EnvRunResult(
+            task_id=idx,
+            reward=res.reward,
+            info=res.info,
+            traj=res.messages,
+            trial=trial,
+        )
+
+    def _error_result(trial: int, idx: int, e: Exception) -> EnvRunResult:
+        return EnvRunResult(
+            task_id=idx,
+            reward=0.0,
+            info={"error": str(e), "traceback": traceback.format_exc()},
+            traj=[],
+            trial=trial,
+        )
+
+    def _finish(
+        result: EnvRunResult, start_time: float, usage: UsageTracker
+    ) -> EnvRunResult:
+        result.info["latency"] = time.perf_counter() - start_time
+        result.info["usage"] = usage.to_dict()
+        print(
+            "✅" if result.reward == 1 else "❌",
+            f"task_id={result.task_id}",
+            result.info,
+        )
+        print("-----")
+        checkpoint_writer.append(result.model_dump())
+        return result
+
+    def _run(item: WorkItem) -> EnvRunResult:
+        trial, idx = item
+        isolated_env = env_factory.make(task_index=idx)
 
-        def _run(idx: int) -> EnvRunResult:
-            isolated_env = get_env(
-                config.env,
-                user_strategy=config.user_strategy,
-                user_model=config.user_model,
-                task_split=config.task_split,
-                user_provider=config.user_model_provider,
-                task_index=idx,
-            )
+        print(f"Running task {idx}")
+        start_time = time.perf_counter()
+        with logfire.span(f"run_task_{idx}"), track_usage() as usage:
+            try:
+                res = agent.solve(
+                    env=isolated_env,
+                    task_index=idx,
+                )
+                result = _to_result(trial, idx, res)
+            except Exception as e:
+                result = _error_result(trial, idx, e)
+        return _finish(result, start_time, usage)
+
+    async def _arun(item: WorkItem, semaphore: asyncio.Semaphore) -> EnvRunResult:
+        trial, idx = item
+        async with semaphore:
+            isolated_env = env_factory.make(task_index=idx)
 
             print(f"Running task {idx}")
-            with logfire.span(f"run_task_{idx}"):
+            start_time = time.perf_counter()
+            with logfire.span(f"run_task_{idx}"), track_usage() as usage:
                 try:
-                    res = agent.solve(
+                    res = await agent.asolve(
                         env=isolated_env,
                         task_index=idx,
                     )
-                    result = EnvRunResult(
-                        task_id=idx,
-                        reward=res.reward,
-                        info=res.info,
-                        traj=res.messages,
-                        trial=i,
-                    )
+                    result = _to_result(trial, idx, res)
                 except Exception as e:
-                    result = EnvRunResult(
-                        task_id=idx,
-                        reward=0.0,
-                        info={"error": str(e), "traceback": traceback.format_exc()},
-                        traj=[],
-                        trial=i,
-                    )
-            print(
-                "✅" if result.reward == 1 else "❌",
-                f"task_id={idx}",
-                result.info,
-            )
-            print("-----")
-            with lock:
-                data = []
-                if os.path.exists(ckpt_path):
-                    with open(ckpt_path, "r") as f:
-                        data = json.load(f)
-                with open(ckpt_path, "w") as f:
-                    json.dump(data + [result.model_dump()], f, indent=2)
-            return result
+                    result = _error_result(trial, idx, e)
+            return _finish(result, start_time, usage)
+
+    async def _arun_all(items: List[WorkItem]) -> List[EnvRunResult]:
+        # one event loop drives every episode; the semaphore bounds how many are
+        # in flight at once and admits them in schedule order
+        semaphore = asyncio.Semaphore(config.max_concurrency)
+        return list(await asyncio.gather(*(_arun(item, semaphore) for item in items)))
 
+    if config.use_async:
+        results.extend(asyncio.run(_arun_all(items)))
+    else:
         with ThreadPoolExecutor(max_workers=config.max_concurrency) as executor:
-            res = list(executor.map(_run, idxs))
+            res = list(executor.map(_run, items))
             results.extend(res)
 
-    display_metrics(results)
+    checkpoint_writer.close()
+    display_metrics(results, prompt_caching=config.prompt_caching)
+    for model, stats in get_concurrency_stats().items():
+        print(
+            f"🚦 {model}: concurrency limit {stats.limit:.1f} (peak {stats.max_limit_reached:.1f}), "
+            f"{stats.congestion_events} rate limits/timeouts in {stats.requests} requests, "
+            f"{stats.backoffs} backoffs"
+        )
+    for model, stats in get_token_budget_stats().items():
+        print(
+            f"🪣 {model}: {stats.tokens} tokens in {stats.requests} requests at "
+            f"{stats.tokens_per_minute} tokens/min, requests waited {stats.wait_time:.1f}s in total for budget"
+        )
 
-    with open(ckpt_path, "w") as f:
-        json.dump([result.model_dump() for result in results], f, indent=2)
-        print(f"\n📄 Results saved to {ckpt_path}\n")
+    consolidate_checkpoint([result.model_dump() for result in results], ckpt_path)
+    os.remove(log_path)
+    print(f"\n📄 Results saved to {ckpt_path}\n")
     return results
 
 
 def agent_factory(tools_info: List[Dict[str, Any]], wiki, config: RunConfig) -> Agent:
+    compactor = history_compactor(
+        config.history_compaction, config.history_token_budget
+    )
     if config.agent_strategy == "tool-calling":
         # native tool calling
         from tau_bench.agents.tool_calling_agent import ToolCallingAgent
@@ -151,6 +276,8 @@ def agent_factory(tools_info: List[Dict[str, Any]], wiki, config: RunConfig) ->
             model=config.model,
             provider=config.model_provider,
             temperature=config.temperature,
+            parallel_tool_calls=config.parallel_tool_calls,
+            compactor=compactor,
         )
     elif config.agent_strategy == "act":
         # `act` from https://arxiv.org/abs/2210.03629
@@ -163,6 +290,7 @@ def agent_factory(tools_info: List[Dict[str, Any]], wiki, config: RunConfig) ->
             provider=config.model_provider,
             use_reasoning=False,
             temperature=config.temperature,
+            compactor=compactor,
         )
     elif config.agent_strategy == "react":
         # `react` from https://arxiv.org/abs/2210.03629
@@ -175,6 +303,7 @@ def agent_factory(tools_info: List[Dict[str, Any]], wiki, config: RunConfig) ->
             provider=config.model_provider,
             use_reasoning=True,
             temperature=config.temperature,
+            compactor=compactor,
         )
     elif config.agent_strategy == "few-shot":
         from tau_bench.agents.few_shot_agent import FewShotToolCallingAgent
@@ -192,32 +321,7 @@ def agent_factory(tools_info: List[Dict[str, Any]], wiki, config: RunConfig) ->
             provider=config.model_provider,
             few_shot_displays=few_shot_displays,
             temperature=config.temperature,
+            parallel_tool_calls=config.parallel_tool_calls,
         )
     else:
         raise ValueError(f"Unknown agent strategy: {config.agent_strategy}")
-
-
-def display_metrics(results: List[EnvRunResult]) -> None:
-    def is_successful(reward: float) -> bool:
-        return (1 - 1e-6) <= reward <= (1 + 1e-6)
-
-    num_trials = len(set([r.trial for r in results]))
-    rewards = [r.reward for r in results]
-    avg_reward = sum(rewards) / len(rewards)
-    # c from https://arxiv.org/pdf/2406.12045
-    c_per_task_id: dict[int, int] = {}
-    for result in results:
-        if result.task_id not in c_per_task_id:
-            c_per_task_id[result.task_id] = 1 if is_successful(result.reward) else 0
-        else:
-            c_per_task_id[result.task_id] += 1 if is_successful(result.reward) else 0
-    pass_hat_ks: dict[int, float] = {}
-    for k in range(1, num_trials + 1):
-        sum_task_pass_hat_k = 0
-        for c in c_per_task_id.values():
-            sum_task_pass_hat_k += comb(c, k) / comb(num_trials, k)
-        pass_hat_ks[k] = sum_task_pass_hat_k / len(c_per_task_id)
-    print(f"🏆 Average reward: {avg_reward}")
-    print("📈 Pass^k")
-    for k, pass_hat_k in pass_hat_ks.items():
-        print(f"  k={k}: {pass_hat_k}")
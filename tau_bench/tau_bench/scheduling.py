@@ -0,0 +1,90 @@
+# Copyright Sierra
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# a (trial, task_id) pair
+WorkItem = Tuple[int, int]
+
+Ordering = Callable[[List[WorkItem], Dict[int, float]], List[WorkItem]]
+
+
+def expected_costs(results: List[Dict[str, Any]]) -> Dict[int, float]:
+    """The expected duration of each task, from the results of previous runs.
+
+    A task's cost is its mean `latency` in seconds. Tasks that were only recorded without
+    a latency (older result files) are estimated from their trajectory length, scaled by
+    the mean seconds per message of the results that have both. If no result has a
+    latency, every task is costed by its trajectory length alone.
+    """
+    latencies: Dict[int, List[float]] = {}
+    lengths: Dict[int, List[int]] = {}
+    total_latency = 0.0
+    total_length = 0
+    for result in results:
+        task_id = result["task_id"]
+        length = len(result.get("traj") or [])
+        lengths.setdefault(task_id, []).append(length)
+        latency = result.get("info", {}).get("latency")
+        if latency is not None:
+            latencies.setdefault(task_id, []).append(latency)
+            total_latency += latency
+            total_length += length
+    seconds_per_message = total_latency / total_length if total_length > 0 else None
+    costs: Dict[int, float] = {}
+    for task_id, task_lengths in lengths.items():
+        if task_id in latencies:
+            costs[task_id] = sum(latencies[task_id]) / len(latencies[task_id])
+        else:
+            mean_length = sum(task_lengths) / len(task_lengths)
+            costs[task_id] = (
+                mean_length * seconds_per_message
+                if seconds_per_message is not None
+                else mean_length
+            )
+    return costs
+
+
+def shard(items: List[WorkItem], shard_index: int, num_shards: int) -> List[WorkItem]:
+    """The work items of one shard. Items are dealt round-robin in (trial, task_id) order,
+    so the partition does not depend on shuffling or scheduling, and shards differ in
+    size by at most one episode."""
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(
+            f"Shard index {shard_index} is out of range for {num_shards} shards"
+        )
+    return [
+        item
+        for position, item in enumerate(sorted(items))
+        if position % num_shards == shard_index
+    ]
+
+
+def order_by_trial(items: List[WorkItem], costs: Dict[int, float]) -> List[WorkItem]:
+    """Runs the work items in the order they were given, i.e. trial by trial."""
+    return list(items)
+
+
+def order_longest_first(
+    items: List[WorkItem], costs: Dict[int, float]
+) -> List[WorkItem]:
+    """Starts the tasks expected to take longest first, so that no straggler is left
+    running alone at the end of the run. Tasks without a recorded cost are assumed to
+    take the mean cost. Ties keep their original order."""
+    default = sum(costs.values()) / len(costs) if len(costs) > 0 else 0.0
+    return sorted(items, key=lambda item: -costs.get(item[1], default))
+
+
+ORDERINGS: Dict[str, Ordering] = {
+    "trial": order_by_trial,
+    "longest-first": order_longest_first,
+}
+
+
+def schedule(
+    items: List[WorkItem],
+    ordering: str = "trial",
+    costs: Optional[Dict[int, float]] = None,
+) -> List[WorkItem]:
+    if ordering not in ORDERINGS:
+        raise ValueError(f"Unknown schedule ordering: {ordering}")
+    return ORDERINGS[ordering](items, costs or {})
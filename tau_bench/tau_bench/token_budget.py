@@ -0,0 +1,131 @@
+# Copyright Sierra
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# tokens reserved for the completion of a request that does not set `max_tokens`
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+def approx_num_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """A rough count of the tokens a completion request will use: its messages and tool
+    schemas at four characters per token, plus the completion."""
+    prompt = json.dumps(kwargs.get("messages", []), default=str)
+    if kwargs.get("tools") is not None:
+        prompt += json.dumps(kwargs["tools"], default=str)
+    return approx_num_tokens(prompt) + kwargs.get(
+        "max_tokens", DEFAULT_COMPLETION_TOKENS
+    )
+
+
+class TokenBudgetStats(BaseModel):
+    tokens_per_minute: int
+    requests: int
+    tokens: int
+    wait_time: float
+
+
+class TokenBucket(object):
+    """Admits requests to one model at `tokens_per_minute` on average, with bursts of up
+    to a minute's worth of tokens.
+
+    Each request reserves its estimated tokens up front and waits until the bucket has
+    refilled to cover them, so requests are admitted in arrival order and large prompts
+    cannot be starved by small ones. Once the provider reports the actual usage, the
+    difference from the estimate is settled with `reconcile`.
+    """
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        self.tokens_per_minute = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.total_tokens = 0
+        self.wait_time = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.tokens_per_minute),
+            self.tokens + (now - self.updated) * self.rate,
+        )
+        self.updated = now
+
+    def _reserve(self, tokens: int) -> float:
+        # a request larger than the whole budget is admitted once the bucket is full
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            self.requests += 1
+            self.total_tokens += tokens
+            wait = max(0.0, -self.tokens / self.rate)
+            self.wait_time += wait
+        return wait
+
+    def acquire(self, tokens: int) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated: int, actual: int) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens -= actual - min(estimated, self.tokens_per_minute)
+            self.total_tokens += actual - min(estimated, self.tokens_per_minute)
+
+    def stats(self) -> TokenBudgetStats:
+        with self._lock:
+            return TokenBudgetStats(
+                tokens_per_minute=self.tokens_per_minute,
+                requests=self.requests,
+                tokens=self.total_tokens,
+                wait_time=self.wait_time,
+            )
+
+
+class TokenBudgets(object):
+    """The token buckets of the models that have a tokens-per-minute limit, keyed by
+    (provider, model)."""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def set(self, provider: Optional[str], model: str, tokens_per_minute: int) -> None:
+        with self._lock:
+            self._buckets[(provider or "", model)] = TokenBucket(tokens_per_minute)
+
+    def get(self, provider: Optional[str], model: str) -> Optional[TokenBucket]:
+        with self._lock:
+            return self._buckets.get((provider or "", model))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, TokenBudgetStats]:
+        with self._lock:
+            buckets: List[Tuple[Tuple[str, str], TokenBucket]] = list(
+                self._buckets.items()
+            )
+        return {
+            f"{provider}/{model}" if provider else model: bucket.stats()
+            for (provider, model), bucket in buckets
+        }
@@ -88,3 +88,19 @@ class RunConfig(BaseModel):
     shuffle: int = 0
     user_strategy: str = "llm"
     few_shot_displays_path: Optional[str] = None
+    parallel_tool_calls: bool = False
+    use_async: bool = False
+    checkpoint_compression: Optional[str] = None
+    resume_path: Optional[str] = None
+    schedule: str = "trial"
+    schedule_history_paths: Optional[List[str]] = None
+    shard_index: int = 0
+    num_shards: int = 1
+    adaptive_concurrency: bool = False
+    tokens_per_minute: Optional[int] = None
+    user_tokens_per_minute: Optional[int] = None
+    cassette_path: Optional[str] = None
+    cassette_mode: str = "replay"
+    prompt_caching: bool = False
+    history_compaction: str = "none"
+    history_token_budget: int = 16000
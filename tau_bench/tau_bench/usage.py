@@ -0,0 +1,70 @@
+# Copyright Sierra
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from pydantic import BaseModel
+
+
+class ModelUsage(BaseModel):
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # prompt tokens read from the provider's prompt cache, and written to it
+    cached_prompt_tokens: int = 0
+    cache_creation_tokens: int = 0
+
+
+class UsageTracker(object):
+    """The token usage of the completions made while it is active, per model."""
+
+    def __init__(self) -> None:
+        self.models: Dict[str, ModelUsage] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: str, res: Any) -> None:
+        usage = getattr(res, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        with self._lock:
+            model_usage = self.models.setdefault(model, ModelUsage())
+            model_usage.requests += 1
+            model_usage.prompt_tokens += usage.prompt_tokens or 0
+            model_usage.completion_tokens += usage.completion_tokens or 0
+            model_usage.cached_prompt_tokens += (
+                getattr(details, "cached_tokens", None) or 0
+            )
+            model_usage.cache_creation_tokens += (
+                getattr(usage, "cache_creation_input_tokens", None) or 0
+            )
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {model: usage.model_dump() for model, usage in self.models.items()}
+
+
+_tracker: ContextVar[Optional[UsageTracker]] = ContextVar("usage_tracker", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageTracker]:
+    """Collects the usage of the completions made in the current thread or task until the
+    block exits, including the asyncio tasks and `asyncio.to_thread` calls it starts.
+    Threads started otherwise (e.g. `threading.Thread` or `ThreadPoolExecutor.submit`)
+    do not inherit the context and are not tracked unless run with
+    `contextvars.copy_context()`."""
+    tracker = UsageTracker()
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+
+
+def record_usage(model: str, res: Any) -> None:
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.add(model, res)
@@ -0,0 +1,8 @@
+# Copyright Sierra
+
+import os
+
+# the tests run offline: keep litellm from fetching its model cost map and Logfire from
+# exporting anything
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
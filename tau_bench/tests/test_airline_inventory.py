@@ -0,0 +1,92 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.envs.airline.data import load_columnar_data, load_data, read_data
+from tau_bench.envs.airline.tools import ALL_TOOLS
+from tau_bench.envs.data_hash import consistent_hash, data_hash, merkle_root, to_hashable
+from tau_bench.envs.task_store import load_tasks
+
+TOOLS_MAP = {tool.get_info()["function"]["name"]: tool for tool in ALL_TOOLS}
+
+MUTATING_TOOLS = {
+    "book_reservation",
+    "cancel_reservation",
+    "update_reservation_baggages",
+    "update_reservation_flights",
+    "update_reservation_passengers",
+    "send_certificate",
+}
+
+
+def replay(data, actions):
+    outputs = []
+    for action in actions:
+        if action.name not in TOOLS_MAP:
+            continue
+        try:
+            outputs.append(TOOLS_MAP[action.name].invoke(data=data, **action.kwargs))
+        except Exception as e:
+            outputs.append(f"Error: {e}")
+    return outputs
+
+
+def mutating_task_indices(limit):
+    tasks = load_tasks("airline", "test")
+    indices = [
+        i
+        for i, task in enumerate(tasks)
+        if any(action.name in MUTATING_TOOLS for action in task.actions)
+    ]
+    return indices[:limit]
+
+
+@pytest.mark.parametrize("task_index", mutating_task_indices(8))
+def test_columnar_and_dict_backends_agree(task_index):
+    actions = load_tasks("airline", "test")[task_index].actions
+    reference = read_data()
+    dict_data = load_data()
+    columnar_data = load_columnar_data()
+    reference_outputs = replay(reference, actions)
+    assert replay(dict_data, actions) == reference_outputs
+    assert replay(columnar_data, actions) == reference_outputs
+    expected = consistent_hash(to_hashable(reference))
+    assert data_hash(dict_data) == expected
+    assert data_hash(columnar_data) == expected
+    assert merkle_root(columnar_data) == merkle_root(dict_data)
+
+
+def test_seat_changes_are_visible_through_the_columnar_views():
+    columnar_data = load_columnar_data()
+    dict_data = load_data()
+    flight_number, date = next(
+        (flight_number, date)
+        for flight_number, flight in dict_data["flights"].items()
+        for date, entry in flight["dates"].items()
+        if entry["status"] == "available"
+    )
+    for data in (dict_data, columnar_data):
+        entry = data["flights"][flight_number]["dates"][date]
+        entry["available_seats"]["economy"] -= 1
+        entry["prices"]["business"] = 150
+        entry["status"] = "cancelled"
+    assert data_hash(columnar_data) == data_hash(dict_data)
+    assert (
+        columnar_data["flights"][flight_number]["dates"][date]
+        == dict_data["flights"][flight_number]["dates"][date]
+    )
+
+
+def test_columnar_inventory_rejects_values_it_cannot_store_exactly():
+    columnar_data = load_columnar_data()
+    flight_number = next(iter(columnar_data["flights"]))
+    flight = columnar_data["flights"][flight_number]
+    date, entry = next(
+        (date, entry)
+        for date, entry in flight["dates"].items()
+        if entry["status"] == "available"
+    )
+    price = entry["prices"]["business"]
+    with pytest.raises(TypeError):
+        entry["prices"]["business"] = price + 0.5
+    assert flight["dates"][date]["prices"]["business"] == price
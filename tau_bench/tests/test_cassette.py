@@ -0,0 +1,113 @@
+# Copyright Sierra
+
+import json
+
+import litellm
+import pytest
+
+from tau_bench import llm
+from tau_bench.agents.chat_react_agent import ChatReActAgent
+from tau_bench.cassette import CassetteMissError
+from tau_bench.envs import get_env
+
+AGENT_MODEL = "gpt-4o"
+USER_MODEL = "gpt-4o-mini"
+
+_completion = litellm.completion
+
+
+def scripted_completion(**kwargs):
+    """A deterministic stand-in for the LLM: the agent looks up a user and then answers,
+    and the user asks once and then ends the conversation."""
+    messages = kwargs["messages"]
+    if kwargs["model"] == USER_MODEL:
+        turns = sum(1 for message in messages if message["role"] == "assistant")
+        reply = "I need help with my order." if turns == 0 else "###STOP###"
+    elif messages[-1]["content"].startswith("API output: "):
+        reply = 'Thought:\nDone.\nAction:\n{"name": "respond", "arguments": {"content": "Found you."}}'
+    else:
+        action = {
+            "name": "find_user_id_by_email",
+            "arguments": {"email": "mia.garcia2723@example.com"},
+        }
+        reply = f"Thought:\nLook the user up.\nAction:\n{json.dumps(action)}"
+    return _completion(
+        model=kwargs["model"], messages=messages, mock_response=reply
+    )
+
+
+def unreachable_completion(**kwargs):
+    raise AssertionError("replay must not call the model")
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    yield str(tmp_path / "cassette.jsonl")
+    llm.use_cassette(None)
+
+
+def solve_episode():
+    env = get_env(
+        "retail",
+        user_strategy="llm",
+        user_model=USER_MODEL,
+        user_provider="openai",
+        task_split="test",
+        task_index=0,
+    )
+    agent = ChatReActAgent(
+        tools_info=env.tools_info,
+        wiki=env.wiki,
+        model=AGENT_MODEL,
+        provider="openai",
+    )
+    return agent.solve(env, task_index=0)
+
+
+def test_replay_reproduces_a_recorded_episode(cassette_path, monkeypatch):
+    monkeypatch.setattr(litellm, "completion", scripted_completion)
+    llm.use_cassette(cassette_path, "record")
+    recorded = solve_episode()
+    assert any(
+        message["content"].startswith("API output: ")
+        for message in recorded.messages
+        if message["role"] == "user"
+    )
+
+    monkeypatch.setattr(litellm, "completion", unreachable_completion)
+    cassette = llm.use_cassette(cassette_path, "replay")
+    replayed = solve_episode()
+    assert replayed.messages == recorded.messages
+    assert replayed.reward == recorded.reward
+    assert replayed.total_cost == recorded.total_cost
+    assert cassette.hits > 0
+
+
+def test_replay_of_an_unrecorded_request_raises(cassette_path, monkeypatch):
+    monkeypatch.setattr(litellm, "completion", scripted_completion)
+    llm.use_cassette(cassette_path, "record")
+    llm.completion(model=USER_MODEL, messages=[{"role": "user", "content": "hi"}])
+    llm.use_cassette(cassette_path, "replay")
+    with pytest.raises(CassetteMissError):
+        llm.completion(model=USER_MODEL, messages=[{"role": "user", "content": "bye"}])
+
+
+def test_repeated_requests_replay_in_recorded_order(cassette_path, monkeypatch):
+    replies = iter(["first", "second"])
+
+    def completion(**kwargs):
+        return _completion(
+            model=kwargs["model"],
+            messages=kwargs["messages"],
+            mock_response=next(replies),
+        )
+
+    request = dict(model=USER_MODEL, messages=[{"role": "user", "content": "hi"}])
+    monkeypatch.setattr(litellm, "completion", completion)
+    llm.use_cassette(cassette_path, "record")
+    llm.completion(**request)
+    llm.completion(**request)
+    monkeypatch.setattr(litellm, "completion", unreachable_completion)
+    llm.use_cassette(cassette_path, "replay")
+    contents = [llm.completion(**request).choices[0].message.content for _ in range(3)]
+    assert contents == ["first", "second", "second"]
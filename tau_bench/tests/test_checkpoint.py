@@ -0,0 +1,78 @@
+# Copyright Sierra
+
+import gzip
+
+import pytest
+
+from tau_bench.checkpoint import (
+    CheckpointWriter,
+    consolidate_checkpoint,
+    jsonl_checkpoint_path,
+    read_checkpoint,
+    resume_checkpoint_paths,
+    write_checkpoint_log,
+)
+
+
+def make_result(task_id, trial=0):
+    return {
+        "task_id": task_id,
+        "reward": 1.0,
+        "info": {"latency": 0.5},
+        "traj": [{"role": "user", "content": f"task {task_id}"}],
+        "trial": trial,
+    }
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_log_round_trips(tmp_path, compression):
+    log_path = jsonl_checkpoint_path(str(tmp_path / "run.json"), compression)
+    results = [make_result(i) for i in range(5)]
+    with CheckpointWriter(log_path, compression=compression) as writer:
+        for result in results:
+            writer.append(result)
+    assert read_checkpoint(log_path) == results
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    log_path = str(tmp_path / "run.jsonl")
+    write_checkpoint_log([make_result(0), make_result(1)], log_path)
+    with open(log_path, "a") as f:
+        f.write('{"task_id": 2, "rew')
+    assert read_checkpoint(log_path) == [make_result(0), make_result(1)]
+
+
+def test_unfinished_gzip_stream_is_read_up_to_the_last_flush(tmp_path):
+    log_path = str(tmp_path / "run.jsonl.gz")
+    writer = CheckpointWriter(log_path, compression="gzip")
+    writer.append(make_result(0))
+    writer.close()
+    with open(log_path, "rb") as f:
+        data = f.read()
+    with open(log_path, "wb") as f:
+        # drop the gzip trailer, as a crash before close would
+        f.write(data[:-8])
+    assert read_checkpoint(log_path) == [make_result(0)]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_resume_appends_to_the_same_log(tmp_path, compression):
+    ckpt_path = str(tmp_path / "run.json")
+    log_path = jsonl_checkpoint_path(ckpt_path, compression)
+    with CheckpointWriter(log_path, compression=compression) as writer:
+        writer.append(make_result(0))
+        writer.append(make_result(1))
+
+    resumed_path, resumed_compression = resume_checkpoint_paths(log_path)
+    assert resumed_path == ckpt_path
+    assert resumed_compression == compression
+    previous = read_checkpoint(log_path)
+    write_checkpoint_log(previous, log_path, resumed_compression)
+    with CheckpointWriter(log_path, compression=resumed_compression) as writer:
+        writer.append(make_result(2))
+    results = read_checkpoint(log_path)
+    assert results == [make_result(0), make_result(1), make_result(2)]
+
+    consolidate_checkpoint(results, ckpt_path)
+    assert read_checkpoint(ckpt_path) == results
+    assert resume_checkpoint_paths(ckpt_path) == (ckpt_path, None)
@@ -0,0 +1,76 @@
+# Copyright Sierra
+
+from tau_bench.agents.compaction import (
+    DropOldTurns,
+    ElideToolOutputs,
+    PromptCurve,
+    messages_tokens,
+)
+from tau_bench.metrics import display_metrics
+from tau_bench.types import EnvRunResult
+
+
+def make_history(num_turns, output_size=400):
+    messages = [
+        {"role": "system", "content": "policy " * 50},
+        {"role": "user", "content": "I need help."},
+    ]
+    for i in range(num_turns):
+        messages.append({"role": "assistant", "content": f"call {i}"})
+        messages.append({"role": "tool", "tool_call_id": str(i), "content": "x" * output_size})
+    return messages
+
+
+def test_prompt_curve_is_not_recorded_without_compaction():
+    curve = PromptCurve()
+    messages = make_history(3)
+    assert curve.prompt(messages, None) is messages
+    assert curve.to_info() == {}
+
+
+def test_prompt_curve_keeps_a_running_total_of_the_full_history():
+    curve = PromptCurve()
+    compactor = ElideToolOutputs(token_budget=300)
+    history = make_history(0)
+    for turn in make_history(6)[2:]:
+        history.append(turn)
+        curve.prompt(history, compactor)
+        assert curve.full[-1] == messages_tokens(history)
+    info = curve.to_info()
+    assert info["full_prompt_tokens_curve"] == curve.full
+    assert info["prompt_tokens_curve"][-1] < info["full_prompt_tokens_curve"][-1]
+
+
+def test_short_tool_outputs_are_not_elided():
+    messages = make_history(6, output_size=5)
+    assert ElideToolOutputs(token_budget=10).compact(messages) is messages
+
+
+def test_dropped_turns_keep_the_system_prompt_the_only_system_message():
+    messages = make_history(8)
+    compacted = DropOldTurns(token_budget=400).compact(messages)
+    assert len(compacted) < len(messages)
+    assert compacted[0] == messages[0]
+    assert [m["role"] for m in compacted].count("system") == 1
+    assert "earlier messages of this conversation were omitted" in compacted[1]["content"]
+    assert compacted[1]["content"].startswith(messages[1]["content"])
+    assert compacted[-2:] == messages[-2:]
+    roles = [m["role"] for m in compacted[1:]]
+    assert all(a != b or a == "tool" for a, b in zip(roles, roles[1:]))
+
+
+def make_result(sent, full):
+    return EnvRunResult(
+        task_id=0,
+        reward=1.0,
+        info={"prompt_tokens_curve": sent, "full_prompt_tokens_curve": full},
+        traj=[],
+        trial=0,
+    )
+
+
+def test_savings_are_only_reported_when_the_history_was_compacted(capsys):
+    display_metrics([make_result([10, 20], [10, 20])])
+    assert "without history compaction" not in capsys.readouterr().out
+    display_metrics([make_result([10, 15], [10, 20])])
+    assert "without history compaction" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+# Copyright Sierra
+
+import math
+import random
+
+from tau_bench.concurrency import AIMDController
+
+
+def noisy_latencies(n, median=3.0, sigma=0.7, seed=0):
+    rnd = random.Random(seed)
+    return [median * math.exp(rnd.gauss(0.0, sigma)) for _ in range(n)]
+
+
+def drive(controller, latencies):
+    for latency in latencies:
+        controller.acquire()
+        controller.release(latency=latency)
+
+
+def test_limit_reaches_max_limit_in_slow_start_despite_noisy_latencies():
+    controller = AIMDController(initial_limit=4, max_limit=64)
+    drive(controller, noisy_latencies(5000, sigma=0.7))
+    assert controller.limit == 64
+
+
+def test_limit_reaches_max_limit_after_a_backoff_despite_noisy_latencies():
+    controller = AIMDController(initial_limit=32, max_limit=64)
+    drive(controller, noisy_latencies(10))
+    limit = controller.limit
+    controller.acquire()
+    controller.release(congested=True)
+    assert controller.limit == limit / 2
+    assert not controller.slow_start
+    for sigma in (0.5, 0.7):
+        drive(controller, noisy_latencies(5000, sigma=sigma, seed=1))
+    assert controller.limit == 64
+
+
+def test_sustained_latency_rise_holds_the_limit():
+    controller = AIMDController(initial_limit=4, max_limit=256, latency_window=100)
+    drive(controller, [1.0] * 20)
+    limit = controller.limit
+    drive(controller, [10.0] * 50)
+    # growth stops once the smoothed latency passes twice the recent minimum
+    assert controller.limit < limit + 10
+
+
+def test_congestion_backs_off_once_per_round_trip():
+    controller = AIMDController(initial_limit=16, max_limit=64)
+    drive(controller, [30.0] * 4)
+    for _ in range(5):
+        controller.acquire()
+    for _ in range(5):
+        controller.release(congested=True)
+    assert controller.limit == 10
+    assert controller.congestion_events == 5
+    assert controller.backoffs == 1
+
+
+def test_limit_stays_within_bounds():
+    controller = AIMDController(initial_limit=2, min_limit=2, max_limit=8)
+    for _ in range(10):
+        controller.acquire()
+        controller.release(congested=True)
+        controller.last_decrease = float("-inf")
+    assert controller.limit == 2
+    drive(controller, [1.0] * 1000)
+    assert controller.limit == 8
@@ -0,0 +1,65 @@
+# Copyright Sierra
+
+import copy
+
+from tau_bench.envs.data_hash import (
+    consistent_hash,
+    data_hash,
+    merkle_root,
+    to_hashable,
+)
+from tau_bench.envs.retail.data import read_data
+from tau_bench.envs.snapshot import DataSnapshot
+
+
+def reference_hash(data):
+    return consistent_hash(to_hashable(data))
+
+
+def make_data():
+    return {
+        "users": {
+            "u1": {"name": "Ann", "orders": ["o1"], "address": {"zip": "10001"}},
+            "u2": {"name": "Bob", "orders": [], "address": {"zip": "94105"}},
+        },
+        "orders": {
+            "o1": {"user_id": "u1", "items": [{"id": "i1", "price": 9.5}]},
+        },
+    }
+
+
+def test_data_hash_of_untouched_overlay_matches_reference():
+    data = make_data()
+    overlay = DataSnapshot(copy.deepcopy(data)).overlay()
+    assert data_hash(overlay) == reference_hash(data)
+    assert data_hash(data) == reference_hash(data)
+
+
+def test_data_hash_after_mutations_matches_reference():
+    data = make_data()
+    overlay = DataSnapshot(copy.deepcopy(data)).overlay()
+    for db in (data, overlay):
+        db["users"]["u2"]["orders"].append("o2")
+        db["orders"]["o2"] = {"user_id": "u2", "items": []}
+        del db["orders"]["o1"]
+    assert data_hash(overlay) == reference_hash(data)
+    assert merkle_root(overlay) == merkle_root(data)
+
+
+def test_merkle_root_tracks_data_hash():
+    data = make_data()
+    snapshot = DataSnapshot(copy.deepcopy(data))
+    changed = snapshot.overlay()
+    changed["users"]["u1"]["name"] = "Anna"
+    assert merkle_root(snapshot.overlay()) == merkle_root(data)
+    assert merkle_root(changed) != merkle_root(data)
+    assert data_hash(changed) != reference_hash(data)
+
+
+def test_data_hash_of_retail_data_matches_reference():
+    data = read_data()
+    overlay = DataSnapshot(read_data()).overlay()
+    order_id = next(iter(data["orders"]))
+    for db in (data, overlay):
+        db["orders"][order_id]["status"] = "cancelled"
+    assert data_hash(overlay) == reference_hash(data)
@@ -0,0 +1,55 @@
+# Copyright Sierra
+
+import os
+
+import pytest
+
+from tau_bench.envs import get_env
+from tau_bench.envs import gt_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(gt_cache.CACHE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.delenv(gt_cache.DISABLE_ENV_VAR, raising=False)
+    monkeypatch.setattr(gt_cache, "_default_cache", None)
+    return tmp_path
+
+
+def test_cached_gt_hashes_match_replayed_hashes(cache_dir, monkeypatch):
+    env = get_env(
+        "retail",
+        user_strategy="human",
+        user_model="gpt-4o",
+        task_split="test",
+        task_index=3,
+    )
+    data, actions = env.data, list(env.actions)
+    miss = env.get_gt_data_hashes()
+    assert len(os.listdir(cache_dir / "gt_hashes" / "retail-test")) == 1
+    hit = env.get_gt_data_hashes()
+    monkeypatch.setenv(gt_cache.DISABLE_ENV_VAR, "1")
+    uncached = env.get_gt_data_hashes()
+    assert miss == hit == uncached
+    # the ground truth is replayed on a private copy of the data
+    assert env.data is data
+    assert env.actions == actions
+
+
+def test_fingerprint_covers_replay_and_tool_modules():
+    assert "tau_bench.envs.base" in gt_cache.TOOL_HELPER_MODULES
+    assert "tau_bench.envs.tool" in gt_cache.TOOL_HELPER_MODULES
+
+
+def test_entries_do_not_overwrite_each_other(tmp_path):
+    cache = gt_cache.GroundTruthCache(str(tmp_path))
+    cache.set("retail", "test", 0, "a", {"gt_data_hash": "x", "gt_merkle_root": "y"})
+    other = gt_cache.GroundTruthCache(str(tmp_path))
+    other.set("retail", "test", 1, "b", {"gt_data_hash": "z", "gt_merkle_root": "w"})
+    reader = gt_cache.GroundTruthCache(str(tmp_path))
+    assert reader.get("retail", "test", 0, "a") == {
+        "gt_data_hash": "x",
+        "gt_merkle_root": "y",
+    }
+    assert reader.get("retail", "test", 1, "b")["gt_data_hash"] == "z"
+    assert reader.get("retail", "test", 0, "b") is None
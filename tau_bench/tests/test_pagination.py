@@ -0,0 +1,84 @@
+# Copyright Sierra
+
+import json
+
+import pytest
+
+from tau_bench.envs.airline.data import load_columnar_data
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.airline.tools.search_direct_flight import SearchDirectFlight
+from tau_bench.envs.airline.tools.search_onestop_flight import SearchOnestopFlight
+from tau_bench.envs.pagination import encode_cursor
+from tau_bench.envs.retail.data import load_data as load_retail_data
+from tau_bench.envs.retail.tools.list_all_product_types import ListAllProductTypes
+
+DATE = "2024-05-20"
+
+
+def all_pages(invoke, page_size, **kwargs):
+    pages = []
+    cursor = None
+    while True:
+        page = json.loads(invoke(page_size=page_size, cursor=cursor, **kwargs))
+        pages.append(page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def connection_key(connection):
+    first, second = connection
+    return (first["flight_number"], second["flight_number"], second["date"])
+
+
+@pytest.fixture(params=["dict", "columnar"])
+def airline_data(request):
+    return load_airline_data() if request.param == "dict" else load_columnar_data()
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 5, 100])
+def test_onestop_pages_concatenate_to_the_sorted_results(airline_data, page_size):
+    kwargs = dict(data=airline_data, origin="JFK", destination="LAX", date=DATE)
+    full = json.loads(SearchOnestopFlight.invoke(**kwargs))
+    assert len(full) > 5
+    pages = all_pages(SearchOnestopFlight.invoke, page_size, **kwargs)
+    assert all(len(page) <= page_size for page in pages)
+    assert [c for page in pages for c in page] == sorted(full, key=connection_key)
+
+
+@pytest.mark.parametrize("page_size", [1, 3])
+def test_direct_pages_concatenate_to_the_sorted_results(airline_data, page_size):
+    kwargs = dict(data=airline_data, origin="MIA", destination="LAX", date=DATE)
+    full = json.loads(SearchDirectFlight.invoke(**kwargs))
+    assert len(full) > 1
+    pages = all_pages(SearchDirectFlight.invoke, page_size, **kwargs)
+    assert [f for page in pages for f in page] == sorted(
+        full, key=lambda flight: flight["flight_number"]
+    )
+
+
+@pytest.mark.parametrize("page_size", [1, 4, 50])
+def test_product_type_pages_concatenate_to_the_full_listing(page_size):
+    data = load_retail_data()
+    full = json.loads(ListAllProductTypes.invoke(data=data))
+    pages = all_pages(ListAllProductTypes.invoke, page_size, data=data)
+    merged = [item for page in pages for item in page.items()]
+    assert merged == sorted(full.items())
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["not a cursor", encode_cursor(["a", "b"]), encode_cursor(42), encode_cursor(None)],
+)
+def test_bad_cursors_are_rejected(cursor):
+    output = ListAllProductTypes.invoke(data=load_retail_data(), cursor=cursor)
+    assert output == "Error: invalid cursor"
+
+
+def test_bad_connection_cursor_and_page_size_are_rejected():
+    data = load_airline_data()
+    kwargs = dict(data=data, origin="JFK", destination="LAX", date=DATE)
+    output = SearchOnestopFlight.invoke(cursor=encode_cursor("HAT001"), **kwargs)
+    assert output == "Error: invalid cursor"
+    output = SearchOnestopFlight.invoke(page_size=0, **kwargs)
+    assert output.startswith("Error: ")
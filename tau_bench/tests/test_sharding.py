@@ -0,0 +1,62 @@
+# Copyright Sierra
+
+import json
+
+import pytest
+
+from tau_bench.checkpoint import merge_checkpoints
+from tau_bench.metrics import display_metrics
+from tau_bench.scheduling import shard
+
+
+def make_items(num_trials, num_tasks):
+    return [(trial, task_id) for trial in range(num_trials) for task_id in range(num_tasks)]
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 3, 7, 20])
+def test_shards_partition_the_items(num_shards):
+    items = make_items(3, 10)
+    shards = [shard(items, i, num_shards) for i in range(num_shards)]
+    assert sorted(item for items_ in shards for item in items_) == sorted(items)
+    assert sum(len(items_) for items_ in shards) == len(items)
+    sizes = [len(items_) for items_ in shards]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_shards_do_not_depend_on_item_order():
+    items = make_items(2, 9)
+    shuffled = list(reversed(items))
+    for i in range(4):
+        assert sorted(shard(items, i, 4)) == sorted(shard(shuffled, i, 4))
+
+
+@pytest.mark.parametrize("shard_index", [-1, 3])
+def test_shard_index_out_of_range(shard_index):
+    with pytest.raises(ValueError):
+        shard(make_items(1, 5), shard_index, 3)
+
+
+def make_result(trial, task_id, error=False):
+    info = {"error": "boom"} if error else {}
+    return {"task_id": task_id, "reward": 0.0, "info": info, "traj": [], "trial": trial}
+
+
+def test_merge_combines_shards_and_prefers_results_without_errors(tmp_path):
+    paths = []
+    shard_results = [
+        [make_result(0, 1), make_result(1, 0, error=True)],
+        [make_result(0, 0), make_result(1, 0)],
+        [],
+    ]
+    for i, results in enumerate(shard_results):
+        path = tmp_path / f"shard-{i}.json"
+        path.write_text(json.dumps(results))
+        paths.append(str(path))
+    merged = merge_checkpoints(paths)
+    assert [(r["trial"], r["task_id"]) for r in merged] == [(0, 0), (0, 1), (1, 0)]
+    assert "error" not in merged[2]["info"]
+
+
+def test_display_metrics_of_an_empty_shard(capsys):
+    display_metrics([])
+    assert "No episodes" in capsys.readouterr().out
@@ -0,0 +1,27 @@
+# Copyright Sierra
+
+import importlib
+
+import pytest
+
+from tau_bench.envs import gt_cache, task_store
+from tau_bench.envs.task_store import TASK_MODULES, TaskStore, load_tasks
+
+
+@pytest.mark.parametrize("key", sorted(TASK_MODULES))
+def test_task_store_round_trips_the_task_modules(key, tmp_path, monkeypatch):
+    monkeypatch.setenv(gt_cache.CACHE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.setattr(task_store, "_stores", {})
+    module_name, attr = TASK_MODULES[key]
+    tasks = getattr(importlib.import_module(module_name), attr)
+    store = load_tasks(*key)
+    assert isinstance(store, TaskStore)
+    assert len(store) == len(tasks)
+    assert list(store) == tasks
+    assert store[-1] == tasks[-1]
+    assert store[1:3] == tasks[1:3]
+    # a second process reads the compiled store instead of recompiling it
+    monkeypatch.setattr(task_store, "_stores", {})
+    assert list(load_tasks(*key)) == tasks
+    with pytest.raises(IndexError):
+        store[len(tasks)]